@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import signal
+import statistics
+import sys
+import tempfile
+from typing import Dict, List
+
+from generators import SIZES, generate
+from registry import Solver
+from run import DAYS, run, select
+
+BASELINE = 'bench.json'
+
+
+class Timeout(Exception):
+    pass
+
+
+def _alarm(signum, frame):
+    raise Timeout
+
+
+def bench(solver: Solver, filename: str, size: int, repeat: int,
+          timeout: int) -> Dict:
+    # parse again for every run, some solvers modify their input. The memory
+    # is measured in one extra run, tracing it skews the timings.
+    runs = []
+    signal.signal(signal.SIGALRM, _alarm)
+    for i in range(repeat + 1):
+        signal.alarm(timeout)
+        try:
+            runs.append(run(solver, filename, trace=i == repeat))
+        finally:
+            signal.alarm(0)
+    traced = runs.pop()
+    solve = [r['solve_s'] for r in runs]
+    parse = [r['parse_s'] for r in runs]
+    total = min(p + s for p, s in zip(parse, solve))
+    return {
+        'solver': solver.name,
+        'size': size,
+        'parse_s': min(parse),
+        'solve_s': min(solve),
+        'solve_median_s': statistics.median(solve),
+        'throughput': size / total if total else None,
+        'peak_alloc_kb': traced['peak_alloc_kb'],
+        'answer': runs[0]['answer'],
+    }
+
+
+def key(result: Dict) -> str:
+    return '%s@%d' % (result['solver'], result['size'])
+
+
+def load_baseline(filename: str) -> Dict[str, Dict]:
+    if not os.path.exists(filename):
+        return {}
+    with open(filename) as f:
+        return json.load(f)
+
+
+def save_baseline(filename: str, baseline: Dict[str, Dict]):
+    with open(filename, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(
+        description='Benchmark solvers on generated inputs and compare '
+                    'against a stored baseline.')
+    parser.add_argument('solvers', nargs='*',
+                        help='day (e.g. day8) or part (e.g. day8.part2), '
+                             'default is all')
+    parser.add_argument('-n', '--size', type=int,
+                        help='input size, default depends on the day')
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    parser.add_argument('-r', '--repeat', type=int, default=3)
+    parser.add_argument('-t', '--timeout', type=int, default=60,
+                        help='seconds per run before it counts as failed')
+    parser.add_argument('-b', '--baseline', default=BASELINE)
+    parser.add_argument('--save', action='store_true',
+                        help='store the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=20,
+                        help='allowed slowdown in percent')
+    args = parser.parse_args(argv)
+
+    baseline = load_baseline(args.baseline)
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in args.solvers or DAYS:
+            day = int(name.split('.')[0][3:])
+            size = args.size or SIZES[day]
+            filename = os.path.join(tmp, '%s-%d-%d.txt' % (name, size, args.seed))
+            with open(filename, 'w') as f:
+                f.write('\n'.join(generate(day, size, args.seed)) + '\n')
+            try:
+                solvers = list(select([name]))
+            except (ImportError, KeyError) as e:
+                print(json.dumps({'solver': name, 'error': repr(e)}), flush=True)
+                failed = True
+                continue
+            for solver in solvers:
+                try:
+                    result = bench(solver, filename, size, args.repeat,
+                                   args.timeout)
+                except Timeout:
+                    result = {'solver': solver.name, 'size': size,
+                              'error': 'timeout after %ds' % args.timeout}
+                    failed = True
+                    print(json.dumps(result), flush=True)
+                    continue
+                previous = baseline.get(key(result))
+                if previous:
+                    limit = previous['solve_s'] * (1 + args.threshold / 100)
+                    result['baseline_s'] = previous['solve_s']
+                    result['regression'] = result['solve_s'] > limit
+                    failed |= result['regression']
+                if args.save:
+                    baseline[key(result)] = result
+                print(json.dumps(result), flush=True)
+    if args.save:
+        save_baseline(args.baseline, baseline)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,109 @@
+from math import gcd
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# x = residue (mod modulus)
+Congruence = Tuple[int, int]
+
+
+# Extended Euclidean algorithm, iteratively: (g, x, y) with a*x + b*y = g
+def egcd(a: int, b: int) -> Tuple[int, int, int]:
+    x0, y0, x1, y1 = 1, 0, 0, 1
+    while b:
+        q, r = divmod(a, b)
+        a, b = b, r
+        x0, x1 = x1, x0 - q * x1
+        y0, y1 = y1, y0 - q * y1
+    return a, x0, y0
+
+
+def inverse(a: int, modulus: int) -> int:
+    g, x, _ = egcd(a % modulus, modulus)
+    if g != 1:
+        raise RuntimeError('%d has no inverse modulo %d' % (a, modulus))
+    return x % modulus
+
+
+# Combines two congruences with any moduli into one modulo their lcm, or
+# raises if they contradict each other.
+def merge(c1: Congruence, c2: Congruence) -> Congruence:
+    (a1, m1), (a2, m2) = c1, c2
+    g, p, _ = egcd(m1, m2)
+    if (a2 - a1) % g:
+        raise RuntimeError('x = %d (mod %d) and x = %d (mod %d) have no '
+                           'common solution' % (a1, m1, a2, m2))
+    lcm = m1 // g * m2
+    t = (a2 - a1) // g * p % (m2 // g)
+    return (a1 + m1 * t) % lcm, lcm
+
+
+# Garner's algorithm for pairwise coprime moduli. The inverse of the
+# product of the preceding moduli is precomputed for each modulus, so
+# solving for another set of residues is one pass over the moduli.
+class Garner:
+    def __init__(self, moduli: Sequence[int]):
+        self.moduli = tuple(moduli)
+        self._inverses = []
+        product = 1
+        for m in self.moduli:
+            self._inverses.append(inverse(product, m) if m > 1 else 0)
+            product *= m
+        self.modulus = product
+
+    def __call__(self, residues: Sequence[int]) -> int:
+        if len(residues) != len(self.moduli):
+            raise RuntimeError('expected %d residues' % len(self.moduli))
+        x, product = 0, 1
+        for r, m, inv in zip(residues, self.moduli, self._inverses):
+            x += (r - x) * inv % m * product
+            product *= m
+        return x
+
+
+def _validate(congruences: Iterable[Congruence]) -> List[Congruence]:
+    result = []
+    for a, m in congruences:
+        if m < 1:
+            raise RuntimeError('invalid modulus %d' % m)
+        result.append((a % m, m))
+    return result
+
+
+def _coprime(moduli: Sequence[int]) -> bool:
+    product = 1
+    for m in moduli:
+        if gcd(product, m) != 1:
+            return False
+        product *= m
+    return True
+
+
+def _merge_all(congruences: Iterable[Congruence]) -> Congruence:
+    result = (0, 1)
+    for c in congruences:
+        result = merge(result, c)
+    return result
+
+
+# The smallest non-negative solution of a system of congruences and the
+# modulus it's unique for, (0, 1) for an empty system.
+def solve(congruences: Iterable[Congruence]) -> Congruence:
+    return solve_batch([congruences])[0]
+
+
+# Solves many systems, reusing the precomputation for systems with the
+# same (pairwise coprime) moduli.
+def solve_batch(systems: Iterable[Iterable[Congruence]]) -> List[Congruence]:
+    solvers: Dict[Tuple[int, ...], Optional[Garner]] = {}
+    results = []
+    for congruences in systems:
+        congruences = _validate(congruences)
+        moduli = tuple(m for _, m in congruences)
+        if moduli not in solvers:
+            solvers[moduli] = Garner(moduli) if _coprime(moduli) else None
+        garner = solvers[moduli]
+        if garner is None:
+            results.append(_merge_all(congruences))
+        else:
+            results.append((garner([a for a, _ in congruences]),
+                            garner.modulus))
+    return results
@@ -1,41 +1,129 @@
 #!/usr/bin/env python3
+from collections import Counter
+from itertools import combinations
+from math import prod
+from typing import Dict, List, Sequence, Set, Tuple
 
+from registry import register
 from util import *
 
 GOAL = 2020
 
 
-def part1(data, m):
-    for e1 in data:
-        if e1 + m > GOAL:
-            continue
-        for e2 in data:
-            if e1 + e2 == GOAL:
-                return e1, e2
-    return 0, 0
+def _candidates(data: Sequence[int], goal: int, k: int) -> List[int]:
+    # no value is needed more than k times
+    counts = Counter(data)
+    values = sorted(v for v, c in counts.items() for _ in range(min(c, k)))
+    # without negative numbers anything above goal - (k-1) * smallest can't
+    # be part of a solution
+    if values and values[0] >= 0:
+        limit = goal - (k - 1) * values[0]
+        values = [v for v in values if v <= limit]
+    return values
+
 
+def _two_sum(data: Sequence[int], goal: int, first: bool) \
+        -> Set[Tuple[int, ...]]:
+    found = set()
+    seen = set()
+    for v in data:
+        if goal - v in seen:
+            found.add((min(v, goal - v), max(v, goal - v)))
+            if first:
+                break
+        seen.add(v)
+    return found
 
-def part2(data, m):
-    for e1 in data:
-        if e1 + 2 * m >= GOAL:
+
+def _three_sum(values: List[int], goal: int, first: bool) \
+        -> Set[Tuple[int, ...]]:
+    found = set()
+    n = len(values)
+    for i in range(n - 2):
+        if i > 0 and values[i] == values[i - 1]:
             continue
-        for e2 in data:
-            if e1 + e2 + m > GOAL:
-                continue
-            for e3 in data:
-                if e1 + e2 + e3 == GOAL:
-                    return e1, e2, e3
-    return 0, 0, 0
+        lo, hi = i + 1, n - 1
+        while lo < hi:
+            s = values[i] + values[lo] + values[hi]
+            if s < goal:
+                lo += 1
+            elif s > goal:
+                hi -= 1
+            else:
+                found.add((values[i], values[lo], values[hi]))
+                if first:
+                    return found
+                lo += 1
+                hi -= 1
+    return found
+
+
+# Meet in the middle: index all combinations of half the size by their sum,
+# then look up the complement of the combinations of the other half.
+def _meet_in_the_middle(values: List[int], goal: int, k: int, first: bool) \
+        -> Set[Tuple[int, ...]]:
+    found = set()
+    half = k // 2
+    by_sum: Dict[int, List[Tuple[int, ...]]] = {}
+    for c in combinations(range(len(values)), half):
+        by_sum.setdefault(sum(values[i] for i in c), []).append(c)
+    for c in combinations(range(len(values)), k - half):
+        rest = goal - sum(values[i] for i in c)
+        for other in by_sum.get(rest, []):
+            if set(c).isdisjoint(other):
+                found.add(tuple(sorted(values[i] for i in c + other)))
+                if first:
+                    return found
+    return found
+
+
+# All distinct (sorted) tuples of k entries adding up to goal, or only the
+# first one found.
+def k_sum(data: Sequence[int], goal: int, k: int, first=False) \
+        -> List[Tuple[int, ...]]:
+    values = _candidates(data, goal, k)
+    if k == 1:
+        found = {(goal,)} if goal in values else set()
+    elif k == 2:
+        found = _two_sum(values, goal, first)
+    elif k == 3:
+        found = _three_sum(values, goal, first)
+    else:
+        found = _meet_in_the_middle(values, goal, k, first)
+    return sorted(found)
+
+
+def part1(data: Sequence[int]) -> Tuple[int, ...]:
+    found = k_sum(data, GOAL, 2, first=True)
+    return found[0] if found else (0, 0)
+
+
+def part2(data: Sequence[int]) -> Tuple[int, ...]:
+    found = k_sum(data, GOAL, 3, first=True)
+    return found[0] if found else (0, 0, 0)
+
+
+register(1, 1, load_ints, lambda d: prod(part1(d)))
+register(1, 2, load_ints, lambda d: prod(part2(d)))
 
 
 if __name__ == "__main__":
-    expenses = as_int(load('day1.txt'))
-    minimum = min(expenses)
+    assert k_sum([1721, 979, 366, 299, 675, 1456], GOAL, 2) == [(299, 1721)]
+    assert k_sum([1721, 979, 366, 299, 675, 1456], GOAL, 3) == \
+           [(366, 675, 979)]
+    assert k_sum([1, 2, 3, 4, 5, 6], 10, 4) == [(1, 2, 3, 4)]
+    assert k_sum([5, 5, 5, 1], 10, 2) == [(5, 5)]
+    assert k_sum([5, 1], 10, 2) == []
+
+    expenses = load_ints('day1.txt')
+    with Mapped('day1.txt') as f:
+        assert [int(line) for line in f.lines()] == list(expenses)
+        assert sum(len(block) for block in f.blocks(64)) == len(f)
 
-    entry1, entry2 = part1(expenses, minimum)
-    assert (entry1, entry2) == (1491, 529)
+    entry1, entry2 = part1(expenses)
+    assert (entry1, entry2) == (529, 1491)
     print("Part 1: %d x %d = %d" % (entry1, entry2, entry1 * entry2))
 
-    entry1, entry2, entry3 = part2(expenses, minimum)
+    entry1, entry2, entry3 = part2(expenses)
     assert (entry1, entry2, entry3) == (222, 843, 955)
     print("Part 2: %d x %d x %d = %d" % (entry1, entry2, entry3, entry1 * entry2 * entry3))
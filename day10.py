@@ -1,84 +1,81 @@
 #!/usr/bin/env python3
-from itertools import groupby
-from typing import List, Dict, Set
-
-from util import load, as_int
-
-
-def rating_for(data: List[int]) -> List[int]:
-    inputs = [0] + data
-    outputs = data + [data[-1] + 3]
-    in_outs = zip(inputs, outputs)
-    deltas = map(lambda io: io[1] - io[0], in_outs)
-    sorted_deltas = sorted(deltas)
-    counts = [-1] * 4
-    for k, v in groupby(sorted_deltas):
-        counts[k] = len(list(v))
-    return counts
-
-
-def count_paths(data: Dict[int, List[int]], node: int, dst: int) -> int:
-    if node == dst:
-        return 1
-    # all possible sources to reach this node
-    srcs = data[node]
-    lengths = map(lambda n: count_paths(data, n, dst), srcs)
-    # l = list(lengths)
-    return sum(lengths)
-
-
-def partition_by_src(src: int, data: Dict[int, List[int]], processed: Set[int]):
-    if src not in processed:
-        processed.add(src)
-        if len(data[src]) > 1:
-            for i in data[src]:
-                partition_by_src(i, data, processed)
-
-
-def paths_for(data: List[int]) -> int:
-    ext_data = [0] + data + [data[-1] + 3]
-    # build map of reachable nodes (reversed)
-    reverse_paths = {k: [] for k in ext_data}
-    for n in ext_data:
-        for offset in range(1, 4):
-            if n + offset in reverse_paths:
-                reverse_paths[n + offset].append(n)
-    # partition this into sub-graphs
-    # for each sub-graph, count the paths and multiply
-    total = 1
-    processed = set()
-    for k in reversed(sorted(reverse_paths.keys())):
-        if k in processed:
-            continue
-        v = reverse_paths[k]
-        if len(v) > 1:
-            newly_processed = set()
-            partition_by_src(k, reverse_paths, newly_processed)
-            processed |= newly_processed
-            cnt = count_paths(reverse_paths, max(newly_processed), min(newly_processed))
-            total *= cnt
-        else:
-            processed.add(k)
-    return total
+from array import array
+from collections import deque
+from typing import Iterable, List, Sequence, Tuple
+
+from registry import register
+from util import load_ints
+
+
+# Walks the sorted joltages once, from the outlet (0) to the device (the
+# highest adapter + max_step). Counts the joltage differences and the
+# number of arrangements, which only depend on the adapters at most
+# max_step below, so only those are kept. Unsorted input or a gap larger
+# than max_step can't be chained and is rejected.
+def chain(joltages: Iterable[int], max_step=3, modulus: int = None) \
+        -> Tuple[List[int], int]:
+    counts = [0] * (max_step + 1)
+    window = deque([(0, 1)])
+    prev = 0
+    for j in joltages:
+        delta = j - prev
+        if not 0 <= delta <= max_step:
+            raise RuntimeError('cannot chain %d after %d' % (j, prev))
+        counts[delta] += 1
+        while j - window[0][0] > max_step:
+            window.popleft()
+        ways = sum(w for v, w in window if v < j)
+        if modulus:
+            ways %= modulus
+        window.append((j, ways))
+        prev = j
+    counts[max_step] += 1
+    ways = sum(w for v, w in window if v == prev)
+    return counts, ways % modulus if modulus else ways
+
+
+def rating_for(data: Iterable[int], max_step=3) -> List[int]:
+    return chain(data, max_step)[0]
+
+
+def paths_for(data: Iterable[int], max_step=3, modulus: int = None) -> int:
+    return chain(data, max_step, modulus)[1]
+
+
+def parse(filename: str) -> Sequence[int]:
+    return array('q', sorted(load_ints(filename)))
+
+
+def rating_product(data: Sequence[int]) -> int:
+    ratings = rating_for(data)
+    return ratings[1] * ratings[3]
+
+
+register(10, 1, parse, rating_product)
+register(10, 2, parse, paths_for)
 
 
 if __name__ == "__main__":
-    joltages = sorted(as_int(load('day10-test.txt')))
+    joltages = parse('day10-test.txt')
     ratings = rating_for(joltages)
     assert 1 * ratings[1] + 3 * ratings[3] == 22
     paths = paths_for(joltages)
     assert paths == 8
 
-    joltages = sorted(as_int(load('day10-test2.txt')))
+    joltages = parse('day10-test2.txt')
     ratings = rating_for(joltages)
     assert ratings[1] * ratings[3] == 220
     paths = paths_for(joltages)
     assert paths == 19208
 
-    joltages = sorted(as_int(load('day10.txt')))
-    ratings = rating_for(joltages)
+    joltages = parse('day10.txt')
+    ratings, paths = chain(joltages)
     assert ratings[1] * ratings[3] == 2244
     print("Rating: %d" % (ratings[1] * ratings[3]))
-    paths = paths_for(joltages)
     assert paths == 3_947_645_370_368
     print("Paths: %d" % paths)
+
+    assert paths_for(joltages, modulus=1_000_000_007) == \
+           3_947_645_370_368 % 1_000_000_007
+    assert paths_for(range(1, 6), max_step=1) == 1
+    assert paths_for(range(1, 6), max_step=5) == 16
@@ -1,126 +1,249 @@
 #!/usr/bin/env python3
-from typing import List, Tuple, Callable
+from array import array
+from collections import Counter
+from itertools import accumulate, chain
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
 
+from registry import register
 from util import load
 
-SeatingArea = List[List[int]]
 Coord = Tuple[int, int]
-CountNeighboursFn = Callable[[Coord, SeatingArea], int]
-
-
-def parse_seat(c: str) -> int:
-    if c == '.':
-        return 0
-    if c == 'L':
-        return 1
-    if c == '#':
-        return 2
-    raise RuntimeError
-
-
-# adding a border around everything for easy processing
-def parse(data: List[str]) -> SeatingArea:
-    result = []
-    for line in data:
-        row = [parse_seat(c) for c in line]
-        result.append([0] + row + [0])
-    empty_row = [0] * (2 + len(data[0]))
-    return [empty_row] + result + [empty_row]
-
-
-def hash_seating(data: SeatingArea) -> int:
-    h = 0
-    for row in data:
-        for n in row:
-            h = h * 3 + n
-    return h
-
-
-def count_seats(data: SeatingArea) -> int:
-    num = 0
-    for row in data:
-        for n in row:
-            if n == 2:
-                num = num + 1
-    return num
-
-
-def count_neighbours_1(coord: Coord, data: SeatingArea) -> int:
-    x, y = coord
-    cnt = 0
-    for dy in range(-1, 2):
-        for dx in range(-1, 2):
-            if dx == 0 and dy == 0:
-                continue
-            cnt += 1 if data[y + dy][x + dx] == 2 else 0
-    return cnt
-
-
-def next_seat(coord: Coord, delta: Coord, data: SeatingArea) -> int:
-    x, y = coord
-    dx, dy = delta
-    while 0 <= x + dx < len(data[0]) and 0 <= y + dy < len(data):
-        x += dx
-        y += dy
-        if data[y][x] != 0:
-            return 1 if data[y][x] == 2 else 0
-    return 0
-
-
-def count_neighbours_2(coord: Coord, data: SeatingArea) -> int:
-    x, y = coord
-    cnt = 0
-    for dy in range(-1, 2):
-        for dx in range(-1, 2):
-            if dx == 0 and dy == 0:
-                continue
-            cnt += next_seat((x, y), (dx, dy), data)
-    return cnt
-
-
-def evolve(data: SeatingArea, counter: CountNeighboursFn,
-           limit: int) -> SeatingArea:
-    new = [[0] * len(data[0]) for _ in range(len(data))]
-    for y in range(1, len(data) - 1):
-        for x in range(1, len(data[0]) - 1):
-            if data[y][x] == 0:
-                continue
-            n = counter((x, y), data)
-            if data[y][x] == 1 and n == 0:
-                new[y][x] = 2
-            elif data[y][x] == 2 and n >= limit:
-                new[y][x] = 1
-            else:
-                new[y][x] = data[y][x]
-    return new
 
 
-def gol_until_steady(data: SeatingArea, counter: CountNeighboursFn,
-                     limit: int) -> int:
-    previous = {hash_seating(data)}
-    num_round = 0
-    while True:
-        num_round += 1
-        # print('Round %d' % num_round)
-        data = evolve(data, counter, limit)
-        h = hash_seating(data)
-        if h in previous:
-            break
-        previous.add(h)
-    return count_seats(data)
+# Seating as bitboards, one int per row with bit x for column x: the (fixed)
+# seats and the occupied ones. The neighbour count of a whole row is
+# computed at once with bitwise adders over the shifted neighbouring rows,
+# giving one int per bit of the count. Rows are written into a second
+# buffer that is swapped in after each generation. Besides a steady state
+# the rule can end up flipping between two states, which shows as the same
+# changes as in the generation before.
+class Bitboard:
+    def __init__(self, lines: List[str]):
+        self.seats = [sum(1 << x for x, c in enumerate(line) if c != '.')
+                      for line in lines]
+        self._rows = [sum(1 << x for x, c in enumerate(line) if c == '#')
+                      for line in lines]
+        self._next = [0] * len(lines)
+
+    @staticmethod
+    def _full_add(a: int, b: int, c: int) -> (int, int):
+        t = a ^ b
+        return t ^ c, (a & b) | (t & c)
+
+    # The bits of the number of occupied neighbours, least significant first
+    @staticmethod
+    def _count(above: int, row: int, below: int) -> List[int]:
+        s1, c1 = Bitboard._full_add(above << 1, above, above >> 1)
+        s2, c2 = Bitboard._full_add(below << 1, below, below >> 1)
+        s3, c3 = (row << 1) ^ (row >> 1), (row << 1) & (row >> 1)
+        b0, t = Bitboard._full_add(s1, s2, s3)
+        u, v = Bitboard._full_add(c1, c2, c3)
+        b1, w = u ^ t, u & t
+        return [b0, b1, v ^ w, v & w]
+
+    # Cells with a count of at least limit, comparing from the top bit down
+    @staticmethod
+    def _at_least(bits: List[int], limit: int) -> int:
+        greater, equal = 0, -1
+        for i in reversed(range(len(bits))):
+            if limit >> i & 1:
+                equal &= bits[i]
+            else:
+                greater |= equal & bits[i]
+                equal &= ~bits[i]
+        return greater | equal
+
+    def _next_row(self, y: int, limit: int) -> int:
+        rows = self._rows
+        row = rows[y]
+        bits = Bitboard._count(rows[y - 1] if y else 0, row,
+                               rows[y + 1] if y < len(rows) - 1 else 0)
+        nobody = ~(bits[0] | bits[1] | bits[2] | bits[3])
+        crowded = Bitboard._at_least(bits, limit)
+        return self.seats[y] & (nobody | (row & ~crowded))
+
+    # One generation, only recomputing the active rows (all by default).
+    # Returns the changed rows, with the bits that flipped.
+    def step(self, limit: int, active: Iterable[int] = None) \
+            -> Dict[int, int]:
+        rows, new = self._rows, self._next
+        if active is None:
+            active = range(len(rows))
+        else:
+            new[:] = rows
+        changed = {}
+        for y in active:
+            new[y] = self._next_row(y, limit)
+            if new[y] != rows[y]:
+                changed[y] = new[y] ^ rows[y]
+        self._rows, self._next = new, rows
+        return changed
+
+    # Changed rows per generation, after the first generation only rows
+    # next to a changed row are recomputed. Ends when nothing changes, or
+    # when the same bits flip back.
+    def _diffs(self, limit: int) -> Iterator[Dict[int, int]]:
+        last = len(self._rows) - 1
+        active, previous = None, None
+        while True:
+            changed = self.step(limit, active)
+            if not changed:
+                return
+            yield changed
+            if changed == previous:
+                return
+            previous = changed
+            active = sorted({n for y in changed for n in (y - 1, y, y + 1)
+                             if 0 <= n <= last})
+
+    # The seats that flipped in each generation
+    def changes(self, limit: int) -> Iterator[List[Coord]]:
+        for changed in self._diffs(limit):
+            yield [(y, x) for y, bits in sorted(changed.items())
+                   for x in range(bits.bit_length()) if bits >> x & 1]
+
+    def run(self, limit: int) -> int:
+        for _ in self._diffs(limit):
+            pass
+        return self.occupied()
+
+    def occupied(self) -> int:
+        return sum(row.bit_count() for row in self._rows)
+
+
+# The seats only, with the seats each one sees (the adjacent ones, or the
+# first one in each direction) precomputed once as CSR arrays. The number
+# of occupied neighbours is kept per seat and updated when a seat flips,
+# and only seats next to a flipped seat (or the seat itself) are evaluated
+# in the next generation.
+class SeatGraph:
+    def __init__(self, lines: List[str], visible=True):
+        height, width = len(lines), len(lines[0])
+        cells = ''.join(lines)
+        self.positions: List[Coord] = [divmod(i, width)
+                                       for i, c in enumerate(cells)
+                                       if c != '.']
+        ids = array('l', [-1] * len(cells))
+        for n, (y, x) in enumerate(self.positions):
+            ids[y * width + x] = n
+        # Seats next to each other on a row, column or diagonal see each
+        # other, and are adjacent if there's no floor in between. Edges are
+        # collected in both directions and sorted by seat into CSR arrays.
+        src, dst = array('l'), array('l')
+        for start, step, length in SeatGraph._lines(height, width):
+            line = cells[start:start + step * (length - 1) + 1:step]
+            seats = [k for k, c in enumerate(line) if c != '.']
+            if not visible:
+                seats = [k for k, n in zip(seats, seats[1:]) if n == k + 1]
+                src.extend(ids[start + k * step] for k in seats)
+                dst.extend(ids[start + (k + 1) * step] for k in seats)
+            else:
+                seats = [ids[start + k * step] for k in seats]
+                src.extend(seats[:-1])
+                dst.extend(seats[1:])
+        src, dst = src + dst, dst + src
+        order = sorted(range(len(src)), key=src.__getitem__)
+        degrees = Counter(src)
+        n = len(self.positions)
+        self._offsets = array('l', accumulate(
+            (degrees[i] for i in range(n)), initial=0))
+        self._targets = array('l', map(dst.__getitem__, order))
+        self._occupied = bytearray(cells[i] == '#' for i in range(len(cells))
+                                   if ids[i] >= 0)
+        self._counts = bytearray(n)
+        for i in range(n):
+            if self._occupied[i]:
+                for e in range(self._offsets[i], self._offsets[i + 1]):
+                    self._counts[self._targets[e]] += 1
+
+    # (start, step, length) of all rows, columns and diagonals in the cells.
+    # In a single column the diagonals are single cells, and the
+    # anti-diagonals' step would be 0, so those are left out.
+    @staticmethod
+    def _lines(height: int, width: int) -> Iterator[Tuple[int, int, int]]:
+        for y in range(height):
+            yield y * width, 1, width
+        for x in range(width):
+            yield x, width, height
+        if width == 1:
+            return
+        for x in range(width):
+            yield x, width + 1, min(height, width - x)
+            yield x, width - 1, min(height, x + 1)
+        for y in range(1, height):
+            yield y * width, width + 1, min(height - y, width)
+            yield y * width + width - 1, width - 1, min(height - y, width)
+
+    def neighbours(self, seat: int) -> array:
+        return self._targets[self._offsets[seat]:self._offsets[seat + 1]]
+
+    # Flips the seats in the frontier that change, returns the flipped seats
+    def step(self, frontier: Iterable[int], limit: int) -> List[int]:
+        occupied, counts = self._occupied, self._counts
+        offsets, targets = self._offsets, self._targets
+        flipped = [i for i in frontier
+                   if (counts[i] >= limit if occupied[i] else not counts[i])]
+        for i in flipped:
+            occupied[i] ^= 1
+            delta = 1 if occupied[i] else -1
+            for t in targets[offsets[i]:offsets[i + 1]]:
+                counts[t] += delta
+        return flipped
+
+    # Seats flipped per generation, ends when nothing flips or the same
+    # seats flip back.
+    def _flips(self, limit: int) -> Iterator[Set[int]]:
+        offsets, targets = self._offsets, self._targets
+        frontier = range(len(self.positions))
+        previous = None
+        while True:
+            flipped = set(self.step(frontier, limit))
+            if not flipped:
+                return
+            yield flipped
+            if flipped == previous:
+                return
+            previous = flipped
+            frontier = set(flipped)
+            frontier.update(chain.from_iterable(
+                targets[offsets[i]:offsets[i + 1]] for i in flipped))
+
+    # The seats that flipped in each generation
+    def changes(self, limit: int) -> Iterator[List[Coord]]:
+        for flipped in self._flips(limit):
+            yield sorted(self.positions[i] for i in flipped)
+
+    def run(self, limit: int) -> int:
+        for _ in self._flips(limit):
+            pass
+        return self.occupied()
+
+    def occupied(self) -> int:
+        return sum(self._occupied)
+
+
+register(11, 1, load, lambda d: Bitboard(d).run(4))
+register(11, 2, load, lambda d: SeatGraph(d).run(5))
 
 
 if __name__ == "__main__":
-    seating = parse(load('day11-test.txt'))
-    occupied = gol_until_steady(seating, count_neighbours_1, 4)
-    assert occupied == 37
-    occupied = gol_until_steady(seating, count_neighbours_2, 5)
-    assert occupied == 26
-
-    seating = parse(load('day11.txt'))
-    occupied = gol_until_steady(seating, count_neighbours_1, 4)
+    seating = load('day11-test.txt')
+    assert Bitboard(seating).run(4) == 37
+    assert SeatGraph(seating, visible=False).run(4) == 37
+    assert SeatGraph(seating).run(5) == 26
+
+    column = ['L', 'L', '.', 'L']
+    assert SeatGraph(column).run(5) == Bitboard(column).run(5) == 3
+
+    seating = load('day11.txt')
+    occupied = Bitboard(seating).run(4)
     assert occupied == 2249
+    assert SeatGraph(seating, visible=False).run(4) == occupied
     print('Seat count: %d' % occupied)
-    occupied = gol_until_steady(seating, count_neighbours_2, 5)
+    occupied = SeatGraph(seating).run(5)
     assert occupied == 2023
     print('Seat count: %d' % occupied)
+
+    rounds = list(Bitboard(seating).changes(4))
+    assert rounds == list(SeatGraph(seating, visible=False).changes(4))
+    print('Steady after %d rounds' % len(rounds))
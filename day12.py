@@ -1,90 +1,290 @@
 #!/usr/bin/env python3
-from typing import List, Tuple
+from array import array
+from itertools import islice
+from typing import Iterable, Iterator, List, Tuple
 
-from util import load
+from registry import register
+from util import load, stream
 
 Coord = Tuple[int, int]
+Matrix = Tuple[int, int, int, int]  # 2x2, row major
 
-TURN_LEFT = {
-    (1, 0): (0, 1),
-    (0, 1): (-1, 0),
-    (-1, 0): (0, -1),
-    (0, -1): (1, 0)
+# An affine map of the ship's state, its position and its heading (or
+# waypoint): position += A * heading + p, heading = R * heading + v. Kept
+# flat as (A, R, p, v) with the 2x2 matrices in row major order.
+Transform = Tuple[int, int, int, int, int, int, int, int, int, int, int, int]
+
+IDENTITY = (0, 0, 0, 0, 1, 0, 0, 1, 0, 0, 0, 0)
+# counter-clockwise rotations
+ROTATIONS = {
+    0: (1, 0, 0, 1),
+    90: (0, -1, 1, 0),
+    180: (-1, 0, 0, -1),
+    270: (0, 1, -1, 0),
 }
+MOVES = {'N': (0, 1), 'S': (0, -1), 'E': (1, 0), 'W': (-1, 0)}
+
+
+# The first transform followed by the second one
+def then(first: Transform, second: Transform) -> Transform:
+    a0, a1, a2, a3, r0, r1, r2, r3, px, py, vx, vy = first
+    b0, b1, b2, b3, s0, s1, s2, s3, qx, qy, wx, wy = second
+    return (a0 + b0 * r0 + b1 * r2, a1 + b0 * r1 + b1 * r3,
+            a2 + b2 * r0 + b3 * r2, a3 + b2 * r1 + b3 * r3,
+            s0 * r0 + s1 * r2, s0 * r1 + s1 * r3,
+            s2 * r0 + s3 * r2, s2 * r1 + s3 * r3,
+            px + b0 * vx + b1 * vy + qx, py + b2 * vx + b3 * vy + qy,
+            s0 * vx + s1 * vy + wx, s2 * vx + s3 * vy + wy)
+
+
+def apply(t: Transform, pos: Coord, vec: Coord) -> Tuple[Coord, Coord]:
+    a0, a1, a2, a3, r0, r1, r2, r3, px, py, vx, vy = t
+    x, y = vec
+    return ((pos[0] + a0 * x + a1 * y + px, pos[1] + a2 * x + a3 * y + py),
+            (r0 * x + r1 * y + vx, r2 * x + r3 * y + vy))
 
 
 def parse(direction: str) -> Tuple[str, int]:
     return direction[0], int(direction[1:])
 
 
-def turn_1(heading: Coord, value: int) -> Coord:
-    steps = value // 90
-    for _ in range(steps):
-        heading = TURN_LEFT[heading]
-    return heading
+def rotation(action: str, value: int) -> Matrix:
+    angle = (value if action == 'L' else 360 - value) % 360
+    if angle not in ROTATIONS:
+        raise RuntimeError('%s%d' % (action, value))
+    return ROTATIONS[angle]
 
 
-def move_1(pos: Coord, heading: Coord, directions: List[str]) -> Coord:
+# With a waypoint, N, S, E and W move the waypoint instead of the ship
+def compile_instruction(direction: str, waypoint=False) -> Transform:
+    action, value = parse(direction)
+    if action in MOVES:
+        dx, dy = MOVES[action]
+        if waypoint:
+            return IDENTITY[:10] + (dx * value, dy * value)
+        return IDENTITY[:8] + (dx * value, dy * value) + IDENTITY[10:]
+    if action in 'LR':
+        return IDENTITY[:4] + rotation(action, value) + IDENTITY[8:]
+    if action == 'F':
+        return (value, 0, 0, value) + IDENTITY[4:]
+    raise RuntimeError(direction)
+
+
+def compile_route(directions: Iterable[str], waypoint=False) \
+        -> List[Transform]:
+    return [compile_instruction(d, waypoint) for d in directions]
+
+
+# Composes the transforms pairwise, in a balanced tree
+def compose(transforms: List[Transform]) -> Transform:
+    while len(transforms) > 1:
+        paired = list(map(then, transforms[::2], transforms[1::2]))
+        if len(transforms) % 2:
+            paired.append(transforms[-1])
+        transforms = paired
+    return transforms[0] if transforms else IDENTITY
+
+
+# A route in a segment tree of transforms, so the state after any number of
+# instructions is a composition of O(log n) nodes. The leaves are blocks of
+# instructions rather than single ones, the rest of the last block is folded
+# at query time. The instructions are kept as action bytes and 32-bit
+# values, the nodes flat in an array of 64-bit ints (a list if they
+# overflow), so a route of 10^8 instructions fits in about 1 GB.
+class Route:
+    def __init__(self, directions: Iterable[str], pos: Coord, vec: Coord,
+                 waypoint=False, block=64):
+        self.pos = pos
+        self.vec = vec
+        self.waypoint = waypoint
+        self._block = block
+        self._actions = bytearray()
+        self._values = array('i')
+        for direction in directions:
+            self._actions.append(ord(direction[0]))
+            self._values.append(int(direction[1:]))
+        self._len = len(self._values)
+        blocks = -(-self._len // block)
+        self._size = 1
+        while self._size < blocks:
+            self._size *= 2
+        self._tree = array('q', IDENTITY) * (2 * self._size)
+        for b in range(blocks):
+            self._store(self._size + b,
+                        self._fold(b * block, min((b + 1) * block, self._len)))
+        for i in range(self._size - 1, 0, -1):
+            self._store(i, then(self._node(2 * i), self._node(2 * i + 1)))
+
+    def __len__(self):
+        return self._len
+
+    def _node(self, i: int) -> Transform:
+        return tuple(self._tree[12 * i:12 * i + 12])
+
+    def _store(self, i: int, t: Transform):
+        try:
+            self._tree[12 * i:12 * i + 12] = array('q', t)
+        except OverflowError:
+            self._tree = list(self._tree)
+            self._tree[12 * i:12 * i + 12] = t
+
+    # The instructions from lo to hi folded into one transform directly,
+    # tracking the state as affine functions of the initial heading.
+    def _fold(self, lo: int, hi: int) -> Transform:
+        a0 = a1 = a2 = a3 = px = py = vx = vy = 0
+        r0, r1, r2, r3 = ROTATIONS[0]
+        for action, value in zip(self._actions[lo:hi].decode(),
+                                 self._values[lo:hi]):
+            if action == 'F':
+                a0, a1 = a0 + value * r0, a1 + value * r1
+                a2, a3 = a2 + value * r2, a3 + value * r3
+                px, py = px + value * vx, py + value * vy
+            elif action in MOVES:
+                dx, dy = MOVES[action]
+                if self.waypoint:
+                    vx, vy = vx + dx * value, vy + dy * value
+                else:
+                    px, py = px + dx * value, py + dy * value
+            elif action in 'LR':
+                s0, s1, s2, s3 = rotation(action, value)
+                r0, r1, r2, r3 = (s0 * r0 + s1 * r2, s0 * r1 + s1 * r3,
+                                  s2 * r0 + s3 * r2, s2 * r1 + s3 * r3)
+                vx, vy = s0 * vx + s1 * vy, s2 * vx + s3 * vy
+            else:
+                raise RuntimeError('%s%d' % (action, value))
+        return a0, a1, a2, a3, r0, r1, r2, r3, px, py, vx, vy
+
+    # The composition of the first n instructions
+    def prefix(self, n: int) -> Transform:
+        if not 0 <= n <= self._len:
+            raise IndexError(n)
+        left, right = IDENTITY, IDENTITY
+        lo, hi = self._size, self._size + n // self._block
+        while lo < hi:
+            if lo & 1:
+                left = then(left, self._node(lo))
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                right = then(self._node(hi), right)
+            lo //= 2
+            hi //= 2
+        rest = self._fold(n - n % self._block, n)
+        return then(then(left, right), rest)
+
+    def state(self, n: int) -> Tuple[Coord, Coord]:
+        return apply(self.prefix(n), self.pos, self.vec)
+
+    def position(self, n: int) -> Coord:
+        return self.state(n)[0]
+
+
+# Replays instructions as they come in, from any iterable, keeping the
+# state, the largest Manhattan distance from the origin and the bounding
+# box seen so far. Every `every` instructions a checkpoint of all of that
+# is appended to a flat array of CHECKPOINT fields, from which a replay can
+# be resumed.
+class Voyage:
+    CHECKPOINT = ('step', 'x', 'y', 'vx', 'vy', 'max_distance',
+                  'min_x', 'min_y', 'max_x', 'max_y')
+
+    def __init__(self, pos: Coord, vec: Coord, waypoint=False, every=1000):
+        self.waypoint = waypoint
+        self.every = every
+        self.step = 0
+        self.pos = pos
+        self.vec = vec
+        self.max_distance = manhattan_distance(pos)
+        self.box = (pos[0], pos[1], pos[0], pos[1])
+        self.checkpoints = array('q')
+
+    @classmethod
+    def resume(cls, checkpoints: array, index: int, waypoint=False,
+               every=1000) -> 'Voyage':
+        size = len(cls.CHECKPOINT)
+        step, x, y, vx, vy, max_distance, *box = \
+            checkpoints[index * size:(index + 1) * size]
+        voyage = cls((x, y), (vx, vy), waypoint, every)
+        voyage.step = step
+        voyage.max_distance = max_distance
+        voyage.box = tuple(box)
+        voyage.checkpoints = checkpoints[:(index + 1) * size]
+        return voyage
+
+    # Yields (step, position, heading or waypoint) at every checkpoint
+    def replay(self, directions: Iterable[str]) \
+            -> Iterator[Tuple[int, Coord, Coord]]:
+        step, pos, vec = self.step, self.pos, self.vec
+        max_distance = self.max_distance
+        min_x, min_y, max_x, max_y = self.box
+        for direction in directions:
+            pos, vec = apply(compile_instruction(direction, self.waypoint),
+                             pos, vec)
+            step += 1
+            x, y = pos
+            max_distance = max(max_distance, abs(x) + abs(y))
+            min_x, max_x = min(min_x, x), max(max_x, x)
+            min_y, max_y = min(min_y, y), max(max_y, y)
+            if step % self.every == 0:
+                self.checkpoints.extend((step, x, y, vec[0], vec[1],
+                                         max_distance,
+                                         min_x, min_y, max_x, max_y))
+                self._save(step, pos, vec, max_distance,
+                           (min_x, min_y, max_x, max_y))
+                yield step, pos, vec
+        self._save(step, pos, vec, max_distance, (min_x, min_y, max_x, max_y))
+
+    def _save(self, step: int, pos: Coord, vec: Coord, max_distance: int,
+              box: Tuple[int, int, int, int]):
+        self.step, self.pos, self.vec = step, pos, vec
+        self.max_distance, self.box = max_distance, box
+
+    # Replays everything, returns the final position
+    def run(self, directions: Iterable[str]) -> Coord:
+        for _ in self.replay(directions):
+            pass
+        return self.pos
+
+
+# Follows the instructions one by one, only returns the final state
+def sail(pos: Coord, vec: Coord, directions: Iterable[str], waypoint=False) \
+        -> Tuple[Coord, Coord]:
     x, y = pos
+    vx, vy = vec
     for direction in directions:
         action, value = parse(direction)
-        if 'N' == action:
-            y += value
-        elif 'S' == action:
-            y -= value
-        elif 'E' == action:
-            x += value
-        elif 'W' == action:
-            x -= value
-        elif 'L' == action:
-            heading = turn_1(heading, value)
-        elif 'R' == action:
-            heading = turn_1(heading, 360 - value)
-        elif 'F' == action:
-            x, y = x + heading[0] * value, y + heading[1] * value
+        if action == 'F':
+            x, y = x + vx * value, y + vy * value
+        elif action in MOVES:
+            dx, dy = MOVES[action]
+            if waypoint:
+                vx, vy = vx + dx * value, vy + dy * value
+            else:
+                x, y = x + dx * value, y + dy * value
+        elif action in 'LR':
+            r0, r1, r2, r3 = rotation(action, value)
+            vx, vy = r0 * vx + r1 * vy, r2 * vx + r3 * vy
         else:
-            raise RuntimeError
-    return x, y
+            raise RuntimeError(direction)
+    return (x, y), (vx, vy)
 
 
-def turn_2(wp: Coord, value: int) -> Coord:
-    # (10,5) -> (-5,10) -> (-10,-5) -> (5,-10)
-    if value == 90:
-        return -wp[1], wp[0]
-    elif value == 180:
-        return -wp[0], -wp[1]
-    elif value == 270:
-        return wp[1], -wp[0]
-    else:
-        raise RuntimeError
+def move_1(pos: Coord, heading: Coord, directions: List[str]) -> Coord:
+    return sail(pos, heading, directions)[0]
 
 
 def move_2(pos: Coord, wp: Coord, directions: List[str]) -> Coord:
-    for direction in directions:
-        action, value = parse(direction)
-        if 'N' == action:
-            wp = (wp[0], wp[1] + value)
-        elif 'S' == action:
-            wp = (wp[0], wp[1] - value)
-        elif 'E' == action:
-            wp = (wp[0] + value, wp[1])
-        elif 'W' == action:
-            wp = (wp[0] - value, wp[1])
-        elif 'L' == action:
-            wp = turn_2(wp, value)
-        elif 'R' == action:
-            wp = turn_2(wp, 360 - value)
-        elif 'F' == action:
-            pos = pos[0] + wp[0] * value, pos[1] + wp[1] * value
-        else:
-            raise RuntimeError
-    return pos
+    return sail(pos, wp, directions, True)[0]
 
 
 def manhattan_distance(coord: Coord) -> int:
     return abs(coord[0]) + abs(coord[1])
 
 
+register(12, 1, load, lambda d: manhattan_distance(move_1((0, 0), (1, 0), d)))
+register(12, 2, load, lambda d: manhattan_distance(move_2((0, 0), (10, 1), d)))
+
+
 if __name__ == "__main__":
     data = load('day12-test.txt')
     position = move_1((0, 0), (1, 0), data)
@@ -93,6 +293,12 @@ if __name__ == "__main__":
     position = move_2((0, 0), (10, 1), data)
     assert manhattan_distance(position) == 286
 
+    route = Route(data, (0, 0), (10, 1), waypoint=True)
+    assert route.position(0) == (0, 0)
+    assert route.position(1) == (100, 10)
+    assert route.position(3) == (170, 38)
+    assert route.position(len(route)) == position
+
     data = load('day12.txt')
     position = move_1((0, 0), (1, 0), data)
     assert manhattan_distance(position) == 1319
@@ -101,3 +307,18 @@ if __name__ == "__main__":
     position = move_2((0, 0), (10, 1), data)
     assert manhattan_distance(position) == 62434
     print('Manhattan distance: %d' % manhattan_distance(position))
+
+    route = Route(data, (0, 0), (1, 0))
+    assert manhattan_distance(route.position(len(route))) == 1319
+
+    voyage = Voyage((0, 0), (10, 1), waypoint=True, every=100)
+    checkpoints = list(voyage.replay(stream('day12.txt')))
+    assert voyage.pos == position and checkpoints[-1][0] == 700
+    assert voyage.max_distance >= manhattan_distance(position)
+    resumed = Voyage.resume(voyage.checkpoints, 3, waypoint=True, every=100)
+    assert resumed.run(islice(stream('day12.txt'), 400, None)) == position
+    assert resumed.checkpoints == voyage.checkpoints
+    assert (resumed.max_distance, resumed.box) == \
+           (voyage.max_distance, voyage.box)
+    print('Furthest distance: %d, bounding box: %s' %
+          (voyage.max_distance, voyage.box))
@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
 import re
+from array import array
+from itertools import compress
 from typing import Dict, List, Tuple
 
+from registry import register
 from util import load
 
 MASK_RE = re.compile(r'^mask = ([01X]+)$')
@@ -36,27 +39,161 @@ def run_1(lines: List[str]) -> Dict[int, int]:
     return mem
 
 
-def run_2(lines: List[str]) -> Dict[int, int]:
-    def parse_mask(s: str) -> Tuple[int, List[int]]:
+# Memory written through floating masks, as a binary trie on the address
+# bits (most significant first) with a value in each leaf. Nodes are shared:
+# a node is (lo, hi) by id and every distinct one exists once, so a
+# wildcard node is one with lo == hi, and a floating bit costs no more than
+# a fixed one. A write only creates the nodes on its way down, and sums are
+# computed per node, so addresses are never enumerated.
+#
+# The children are kept in two parallel arrays and looked up by a single int
+# key, and the sum of every node in a third array (-1 until computed, the
+# value itself for a leaf, a list if sums outgrow 64 bits). Leaves have no
+# children (-1). Nodes replaced by writes are dropped once they make up a
+# third of the trie.
+class FloatingMemory:
+    def __init__(self, bits=36):
+        self.bits = bits
+        self._lo = array('q')
+        self._hi = array('q')
+        self._sums = array('q')
+        self._ids: Dict[int, int] = {}
+        self._leaves: Dict[int, int] = {}
+        self._root = self._uniform(0, 0)
+        self._limit = 1 << 16
+
+    def _node(self, lo: int, hi: int) -> int:
+        key = lo << 32 | hi
+        node = self._ids.get(key)
+        if node is None:
+            node = self._ids[key] = len(self._lo)
+            self._lo.append(lo)
+            self._hi.append(hi)
+            self._sums.append(-1)
+        return node
+
+    def _leaf(self, value: int) -> int:
+        if value not in self._leaves:
+            self._leaves[value] = len(self._lo)
+            self._lo.append(-1)
+            self._hi.append(-1)
+            self._sums.append(-1)
+            self._set_sum(self._leaves[value], value)
+        return self._leaves[value]
+
+    def _set_sum(self, node: int, total: int):
+        try:
+            self._sums[node] = total
+        except OverflowError:
+            self._sums = list(self._sums)
+            self._sums[node] = total
+
+    # The subtree at the given depth with the same value everywhere
+    def _uniform(self, value: int, depth: int) -> int:
+        node = self._leaf(value)
+        for _ in range(depth, self.bits):
+            node = self._node(node, node)
+        return node
+
+    def write(self, address: int, floating: int, value: int):
+        bits = self.bits
+        los, his = self._lo, self._hi
+        # below the last fixed bit the whole subtree gets the value
+        fixed = ~floating & ((1 << bits) - 1)
+        lowest = (fixed & -fixed).bit_length()
+        last = bits + 1 - lowest if fixed else 0
+        uniform = self._uniform(value, last)
+        done: Dict[int, int] = {}
+
+        def insert(node: int, depth: int) -> int:
+            if depth == last:
+                return uniform
+            if node in done:
+                return done[node]
+            lo, hi = los[node], his[node]
+            bit = 1 << (bits - 1 - depth)
+            if floating & bit:
+                new_lo = insert(lo, depth + 1)
+                new_hi = new_lo if hi == lo else insert(hi, depth + 1)
+            elif address & bit:
+                new_lo, new_hi = lo, insert(hi, depth + 1)
+            else:
+                new_lo, new_hi = insert(lo, depth + 1), hi
+            done[node] = self._node(new_lo, new_hi)
+            return done[node]
+
+        self._root = insert(self._root, 0)
+        if len(self._lo) > self._limit:
+            self._compact()
+
+    # Drops the nodes that are no longer reachable from the root. Children
+    # are always created before their parents, so one pass down the ids
+    # marks the reachable nodes and one pass up renumbers them.
+    def _compact(self):
+        los, his, sums = self._lo, self._hi, self._sums
+        reachable = bytearray(len(los))
+        reachable[self._root] = 1
+        for node in range(self._root, -1, -1):
+            if reachable[node] and los[node] >= 0:
+                reachable[los[node]] = reachable[his[node]] = 1
+        new_los, new_his, new_sums = array('q'), array('q'), array('q')
+        ids, leaves = {}, {}
+        renumbered = array('q', bytes(8 * len(los)))
+        for node in compress(range(len(los)), reachable):
+            lo, total = los[node], sums[node]
+            if lo < 0:
+                leaves[total] = len(new_los)
+                hi = -1
+            else:
+                lo, hi = renumbered[lo], renumbered[his[node]]
+                ids[lo << 32 | hi] = len(new_los)
+            renumbered[node] = len(new_los)
+            new_los.append(lo)
+            new_his.append(hi)
+            try:
+                new_sums.append(total)
+            except OverflowError:
+                new_sums = list(new_sums)
+                new_sums.append(total)
+        self._lo, self._hi, self._sums = new_los, new_his, new_sums
+        self._ids, self._leaves = ids, leaves
+        self._root = renumbered[self._root]
+        self._limit = max(self._limit, len(self._lo) * 3 // 2)
+
+    def __getitem__(self, address: int) -> int:
+        node = self._root
+        for depth in range(self.bits):
+            if address >> (self.bits - 1 - depth) & 1:
+                node = self._hi[node]
+            else:
+                node = self._lo[node]
+        return self._sums[node]
+
+    def _sum(self, node: int) -> int:
+        total = self._sums[node]
+        if total < 0:
+            lo, hi = self._lo[node], self._hi[node]
+            total = 2 * self._sum(lo) if lo == hi \
+                else self._sum(lo) + self._sum(hi)
+            self._set_sum(node, total)
+        return total
+
+    def sum(self) -> int:
+        return self._sum(self._root)
+
+    # The number of distinct trie nodes
+    def __len__(self):
+        return len(self._lo)
+
+
+def run_2(lines: List[str]) -> FloatingMemory:
+    def parse_mask(s: str) -> Tuple[int, int]:
         or_mask = int(s.translate(X_TO_0), 2)
-        noise_mask = [35 - i for i, c in enumerate(s) if c == 'X']
-        return or_mask, noise_mask
-
-    def all_addresses(addr: List[int], noises: List[int]) -> List[int]:
-        if not noises:
-            return addr
-        bit = noises[0]
-        or_mask = 1 << bit
-        and_mask = (2 ** 36 - 1) ^ or_mask
-        new_addr = [a | or_mask for a in addr] + [a & and_mask for a in addr]
-        return all_addresses(new_addr, noises[1:])
-
-    def set_mem(addr: int, val: int):
-        for a in all_addresses([addr], mask[1]):
-            mem[a] = val
+        floating = int(s.replace('1', '0').replace('X', '1'), 2)
+        return or_mask, floating
 
-    mem = {}
-    mask = (0, [])
+    mem = FloatingMemory()
+    mask = (0, 0)
     for line in lines:
         m = re.match(MASK_RE, line)
         if m:
@@ -66,8 +203,7 @@ def run_2(lines: List[str]) -> Dict[int, int]:
             if m:
                 address = int(m.group(1))
                 value = int(m.group(2))
-                address = address | mask[0]
-                set_mem(address, value)
+                mem.write(address | mask[0], mask[1], value)
             else:
                 print("ERR - %s" % line)
                 raise RuntimeError
@@ -78,6 +214,10 @@ def mem_sum(mem: Dict[int, int]) -> int:
     return sum(mem.values())
 
 
+register(14, 1, load, lambda d: mem_sum(run_1(d)))
+register(14, 2, load, lambda d: run_2(d).sum())
+
+
 if __name__ == "__main__":
     data = load('day14-test.txt')
     memory = run_1(data)
@@ -86,8 +226,8 @@ if __name__ == "__main__":
 
     data = load('day14-test2.txt')
     memory = run_2(data)
-    total = mem_sum(memory)
-    assert total == 208
+    assert memory.sum() == 208
+    assert memory[26] == 1 and memory[58] == memory[59] == 100
 
     data = load('day14.txt')
     memory = run_1(data)
@@ -96,6 +236,13 @@ if __name__ == "__main__":
     print('Total is %d' % total)
 
     memory = run_2(data)
-    total = sum(memory.values())
+    total = memory.sum()
     assert total == 3705162613854
     print('Total is %d' % total)
+
+    memory = FloatingMemory()
+    memory.write(0, (1 << 30) - 1, 2)
+    memory.write(1, (1 << 30) - 2, 3)
+    memory.write(0, 1 << 35, 1)
+    assert memory.sum() == 2 * (1 << 29) + 3 * (1 << 29) - 2 + 2
+    assert memory[0] == memory[1 << 35] == 1 and memory[1] == 3
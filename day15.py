@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
-from util import as_int
+from registry import register
+from util import as_int, load
 
 PUZZLE_INPUT = '0,13,1,16,6,17'
 
@@ -21,6 +22,10 @@ def part1(data: str, iterations: int) -> int:
     return last
 
 
+register(15, 1, lambda f: load(f)[0], lambda d: part1(d, 2020))
+register(15, 2, lambda f: load(f)[0], lambda d: part1(d, 30000000))
+
+
 if __name__ == "__main__":
     assert 436 == part1('0,3,6', 2020)
     assert 1 == part1('1,3,2', 2020)
@@ -2,9 +2,10 @@
 import re
 from functools import reduce
 from itertools import chain
-from typing import Dict, List, Set
+from typing import Dict, Iterable, List, Set
 
-from util import load, as_int
+from registry import register
+from util import as_int, records, stream
 
 TruthRow = List[bool]
 TruthMatrix = List[TruthRow]
@@ -34,14 +35,11 @@ class Ticket:
 class Document:
     FIELD_RE = re.compile(r'^([a-z ]+): (\d+)-(\d+) or (\d+)-(\d+)$')
 
-    def __init__(self, data: List[str]):
+    def __init__(self, data: Iterable[str]):
         self._fields: Dict[str, Set[int]] = {}
-        i = 0
+        sections = records(data)
         # fields
-        for i in range(len(data)):
-            line = data[i]
-            if line == '':
-                break
+        for line in next(sections):
             m = re.match(self.FIELD_RE, line)
             if not m:
                 raise RuntimeError
@@ -49,14 +47,14 @@ class Document:
                 set(range(int(m.group(2)), int(m.group(3)) + 1)) | \
                 set(range(int(m.group(4)), int(m.group(5)) + 1))
         # your ticket
-        assert data[i + 1] == 'your ticket:'
-        self._your: Ticket = Ticket(as_int(data[i + 2].split(',')))
+        your = next(sections)
+        assert your[0] == 'your ticket:'
+        self._your: Ticket = Ticket(as_int(your[1].split(',')))
         # nearby tickets
-        assert data[i + 4] == 'nearby tickets:'
-        self._nearby: List[Ticket] = []
-        for i in range(i + 5, len(data)):
-            line = data[i]
-            self._nearby.append(Ticket(as_int(line.split(','))))
+        nearby = next(sections)
+        assert nearby[0] == 'nearby tickets:'
+        self._nearby: List[Ticket] = [Ticket(as_int(line.split(',')))
+                                      for line in nearby[1:]]
 
     def sum_invalids(self) -> int:
         return sum(chain.from_iterable(
@@ -107,19 +105,25 @@ class Document:
         return reduce(lambda a, b: a * b, my_numbers)
 
 
+def score(doc: Document) -> int:
+    doc.remove_invalids()
+    return doc.score()
+
+
+register(16, 1, lambda f: Document(stream(f)), Document.sum_invalids)
+register(16, 2, lambda f: Document(stream(f)), score)
+
+
 if __name__ == "__main__":
-    data = load('day16-test.txt')
-    doc = Document(data)
+    doc = Document(stream('day16-test.txt'))
     result = doc.sum_invalids()
     assert result == 71
 
-    data = load('day16-test2.txt')
-    doc = Document(data)
+    doc = Document(stream('day16-test2.txt'))
     doc.remove_invalids()
     assert doc.classify() == {'row': 0, 'class': 1, 'seat': 2}
 
-    data = load('day16.txt')
-    doc = Document(data)
+    doc = Document(stream('day16.txt'))
     result = doc.sum_invalids()
     assert result == 21980
     print('Sum of invalid numbers is %d' % result)
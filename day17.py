@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 from typing import Tuple, List, Dict, Callable, Generic, TypeVar
 
+from registry import register
 from util import load
 
 G = TypeVar('G')
@@ -118,6 +119,15 @@ class GameOfLife4D(GameOfLife[Grid4D, Coord4D]):
                         self.update_neighbour(c, f)
 
 
+def active_after(gol: GameOfLife, generations: int) -> int:
+    gol.evolve(generations)
+    return gol.active()
+
+
+register(17, 1, load, lambda d: active_after(GameOfLife3D(d), 6))
+register(17, 2, load, lambda d: active_after(GameOfLife4D(d), 6))
+
+
 if __name__ == "__main__":
     data = load('day17-test.txt')
     gol = GameOfLife3D(data)
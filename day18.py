@@ -2,6 +2,7 @@
 import re
 from typing import Callable, List, Tuple
 
+from registry import register
 from util import load
 
 NUMBER = r'^\d+$'
@@ -103,6 +104,10 @@ def eval_part2(line: str) -> int:
     return eval_tokens_part2(tokenize(line))[0]
 
 
+register(18, 1, load, lambda d: sum(map(eval_part1, d)))
+register(18, 2, load, lambda d: sum(map(eval_part2, d)))
+
+
 if __name__ == "__main__":
     assert eval_part1('2 * 3 + (4 * 5)') == 26
     assert eval_part1('5 + (8 * 3 + 9 + 3 * 4 * 3)') == 437
@@ -1,8 +1,9 @@
 #!/usr/bin/env python3
 import itertools
-from typing import List, Tuple, Dict
+from typing import Iterable, List, Tuple, Dict
 
-from util import as_int, load
+from registry import register
+from util import as_int, records, stream
 
 Rule = Tuple[List[List[int]], str]
 
@@ -22,19 +23,10 @@ def parse_rule(s: str) -> Tuple[int, Rule]:
     return rule_id, (anded, final)
 
 
-def parse(lines: List[str]) -> Tuple[Dict[int, Rule], List[str]]:
-    r = {}
-    m = []
-    parsing_rules = True
-    for line in lines:
-        if line == '':
-            parsing_rules = False
-            continue
-        if parsing_rules:
-            rule_id, rule = parse_rule(line)
-            r[rule_id] = rule
-        else:
-            m.append(line)
+def parse(lines: Iterable[str]) -> Tuple[Dict[int, Rule], List[str]]:
+    sections = records(lines)
+    r = dict(parse_rule(line) for line in next(sections))
+    m = [line for section in sections for line in section]
     return r, m
 
 
@@ -68,42 +60,27 @@ def to_nums(s: str) -> List[int]:
     return [int(bits[i:i + 8], 2) for i in range(0, len(bits), 8)]
 
 
-if __name__ == "__main__":
-    the_rules, msgs = parse(load('day19-test.txt'))
-
-    assert expand_rule(the_rules, 4) == ['a']
-    assert expand_rule(the_rules, 5) == ['b']
-    assert expand_rule(the_rules, 1) == ['aaab', 'aaba', 'bbab', 'bbba',
-                                         'abaa', 'abbb', 'baaa', 'babb']
-    assert expand_rule(the_rules, 0) == ['aaaabb', 'aaabab', 'abbabb', 'abbbab',
-                                         'aabaab', 'aabbbb', 'abaaab', 'ababbb']
-    rule0 = set(expand_rule(the_rules, 0))
-    matches0 = len(list(filter(lambda m: m in rule0, msgs)))
-    assert matches0 == 2
-
-    the_rules, msgs = parse(load('day19.txt'))
-    rule0 = set(expand_rule(the_rules, 0))
-    matches0 = len(list(filter(lambda m: m in rule0, msgs)))
-    assert matches0 == 224
-    print('Matching rule 0 : %d/%d' % (matches0, len(msgs)))
+def count_matches_1(rules: Dict[int, Rule], msgs: List[str]) -> int:
+    rule0 = set(expand_rule(rules, 0))
+    return len(list(filter(lambda m: m in rule0, msgs)))
 
-    # -- Part 2 --
 
+def count_matches_2(rules: Dict[int, Rule], msgs: List[str]) -> int:
     # 8: 42 | 42 8
     # 8: 42{1,n}
-    the_rules[8] = [[42], [42, 8]], None
+    rules[8] = [[42], [42, 8]], None
     # 11: 42 31 | 42 11 31
     # 11: 42{1,n} 31{1,n}
-    the_rules[11] = [[42, 31], [42, 11, 31]], None
+    rules[11] = [[42, 31], [42, 11, 31]], None
 
-    matches42 = set(expand_rule(the_rules, 42))
+    matches42 = set(expand_rule(rules, 42))
     len42 = {len(s) for s in matches42}
     assert len(len42) == 1
     len42 = len42.pop()
     assert len42 == 8
     # nums42 = list(sorted([to_nums(m)[0] for m in matches42]))
 
-    matches31 = set(expand_rule(the_rules, 31))
+    matches31 = set(expand_rule(rules, 31))
     len31 = {len(s) for s in matches31}
     assert len(len31) == 1
     len31 = len31.pop()
@@ -132,6 +109,32 @@ if __name__ == "__main__":
             continue
         if not msg:
             matches0 += 1
+    return matches0
+
+
+register(19, 1, lambda f: parse(stream(f)), lambda d: count_matches_1(*d))
+register(19, 2, lambda f: parse(stream(f)), lambda d: count_matches_2(*d))
+
+
+if __name__ == "__main__":
+    the_rules, msgs = parse(stream('day19-test.txt'))
+
+    assert expand_rule(the_rules, 4) == ['a']
+    assert expand_rule(the_rules, 5) == ['b']
+    assert expand_rule(the_rules, 1) == ['aaab', 'aaba', 'bbab', 'bbba',
+                                         'abaa', 'abbb', 'baaa', 'babb']
+    assert expand_rule(the_rules, 0) == ['aaaabb', 'aaabab', 'abbabb', 'abbbab',
+                                         'aabaab', 'aabbbb', 'abaaab', 'ababbb']
+    matches0 = count_matches_1(the_rules, msgs)
+    assert matches0 == 2
+
+    the_rules, msgs = parse(stream('day19.txt'))
+    matches0 = count_matches_1(the_rules, msgs)
+    assert matches0 == 224
+    print('Matching rule 0 : %d/%d' % (matches0, len(msgs)))
+
+    # -- Part 2 --
 
+    matches0 = count_matches_2(the_rules, msgs)
     assert matches0 == 436
     print('Matching rule 0 : %d/%d' % (matches0, len(msgs)))
@@ -1,10 +1,14 @@
 #!/usr/bin/env python3
+import os
 import re
-from typing import List
+from array import array
+from typing import Iterator, List, Tuple
 
+from registry import register
 from util import *
 
 LINE_REGEX = re.compile(r'^(\d+)-(\d+) (.): (.*)$')
+BATCH_REGEX = re.compile(rb'^(\d+)-(\d+) (.): (.*?)\r?$', re.MULTILINE)
 
 
 class PasswordWithPolicy:
@@ -34,6 +38,81 @@ def parse(filename) -> List[PasswordWithPolicy]:
     return data
 
 
+# All passwords of a buffer in parallel arrays, the passwords themselves
+# are offsets into the shared buffer.
+class PasswordBatch:
+    def __init__(self, buffer: bytes):
+        self._buffer = buffer
+        self._min = array('l')
+        self._max = array('l')
+        self._char = array('B')
+        self._start = array('q')
+        self._end = array('q')
+        for m in BATCH_REGEX.finditer(buffer):
+            self._min.append(int(m.group(1)))
+            self._max.append(int(m.group(2)))
+            self._char.append(buffer[m.start(3)])
+            self._start.append(m.start(4))
+            self._end.append(m.end(4))
+        lines = [line for line in buffer.split(b'\n') if line.rstrip(b'\r')]
+        if len(lines) != len(self):
+            line = next(line for line in lines if not BATCH_REGEX.match(line))
+            raise RuntimeError('invalid input: ' + line.decode(errors='replace'))
+
+    def __len__(self):
+        return len(self._min)
+
+    # Number of valid passwords for policy 1 and 2
+    def count_valid(self) -> Tuple[int, int]:
+        buffer = self._buffer
+        valid_1 = valid_2 = 0
+        for low, high, c, start, end in zip(self._min, self._max, self._char,
+                                            self._start, self._end):
+            if low <= buffer.count(c, start, end) <= high:
+                valid_1 += 1
+            first = start + low - 1 < end and buffer[start + low - 1] == c
+            second = start + high - 1 < end and buffer[start + high - 1] == c
+            if first != second:
+                valid_2 += 1
+        return valid_1, valid_2
+
+
+def parse_batch(filename: str) -> PasswordBatch:
+    with open(os.path.join(DATA_DIR, filename), 'rb') as f:
+        return PasswordBatch(f.read())
+
+
+def _chunks(filename: str, size: int) -> Iterator[bytes]:
+    with open(os.path.join(DATA_DIR, filename), 'rb') as f:
+        rest = b''
+        while True:
+            block = f.read(size)
+            if not block:
+                break
+            block = rest + block
+            cut = block.rfind(b'\n') + 1
+            if cut:
+                block, rest = block[:cut], block[cut:]
+            else:
+                block, rest = b'', block
+            yield block
+        yield rest
+
+
+# Same as PasswordBatch.count_valid, but reading the file in chunks
+def count_valid_streaming(filename: str, chunk_size=1 << 20) -> Tuple[int, int]:
+    valid_1 = valid_2 = 0
+    for chunk in _chunks(filename, chunk_size):
+        v1, v2 = PasswordBatch(chunk).count_valid()
+        valid_1 += v1
+        valid_2 += v2
+    return valid_1, valid_2
+
+
+register(2, 1, parse_batch, lambda d: d.count_valid()[0])
+register(2, 2, parse_batch, lambda d: d.count_valid()[1])
+
+
 if __name__ == "__main__":
     p = PasswordWithPolicy('1-3 a: abc')
     # assert p._min == 1
@@ -52,3 +131,13 @@ if __name__ == "__main__":
     valid_passwords_2 = list(filter(lambda pwp: pwp.is_valid_2(), passwords))
     assert len(valid_passwords_2) == 491
     print("Valid passwords : %d" % (len(valid_passwords_2)))
+
+    batch = parse_batch('day2.txt')
+    assert len(batch) == len(passwords)
+    assert batch.count_valid() == (445, 491)
+    assert count_valid_streaming('day2.txt', 100) == (445, 491)
+    try:
+        PasswordBatch(b'1-3 a: abc\n1-3 b\n')
+        assert False
+    except RuntimeError:
+        pass
@@ -1,8 +1,9 @@
 #!/usr/bin/env python3
 import re
-from typing import List, Dict, Tuple
+from typing import Iterable, List, Dict, Tuple
 
-from util import load
+from registry import register
+from util import records, stream
 
 Grid = List[str]
 
@@ -206,31 +207,39 @@ class Photo:
         return total - monsters * 15
 
 
-def parse_tiles(lines: List[str]) -> Tiles:
+def parse_tiles(lines: Iterable[str]) -> Tiles:
     tile_re = re.compile(r'^Tile (\d+):$')
     tiles: Dict[int, Tile] = {}
-    rows = []
-    num = 0
-    for line in lines:
-        m = re.match(tile_re, line)
-        if m:
-            if rows:
-                tiles[num] = Tile(num, rows)
-                rows = []
-            num = int(m.group(1))
-        elif line == '':
-            continue
-        else:
-            rows.append(line)
-    if rows:
-        tiles[num] = Tile(num, rows)
+    for record in records(lines):
+        m = re.match(tile_re, record[0])
+        if not m:
+            raise RuntimeError
+        num = int(m.group(1))
+        tiles[num] = Tile(num, record[1:])
     return tiles
 
 
+def photo_corners(tiles: Tiles) -> int:
+    photo = Photo(tiles)
+    photo.arrange()
+    return photo.corner_product()
+
+
+def photo_waves(tiles: Tiles) -> int:
+    photo = Photo(tiles)
+    photo.arrange()
+    photo.recompose()
+    return photo.count_waves()
+
+
+register(20, 1, lambda f: parse_tiles(stream(f)), photo_corners)
+register(20, 2, lambda f: parse_tiles(stream(f)), photo_waves)
+
+
 if __name__ == "__main__":
     assert rotate_cw(['12', '34']) == ['31', '42']
 
-    photo = Photo(parse_tiles(load('day20-test.txt')))
+    photo = Photo(parse_tiles(stream('day20-test.txt')))
     photo.arrange()
     corner_product = photo.corner_product()
     assert corner_product == 20899048083289
@@ -238,7 +247,7 @@ if __name__ == "__main__":
     waves = photo.count_waves()
     assert waves == 273
 
-    photo = Photo(parse_tiles(load('day20.txt')))
+    photo = Photo(parse_tiles(stream('day20.txt')))
     photo.arrange()
     corner_product = photo.corner_product()
     assert corner_product == 59187348943703
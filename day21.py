@@ -2,15 +2,17 @@
 import re
 from typing import List, Dict, Tuple, Set
 
+from registry import register
 from util import load
 
 LINE_RE = r'(.*) \(contains (.*)\)'
 
 Food = List[Set[str]]
 Allergens = Dict[str, List[int]]
+Puzzle = Tuple[Food, Allergens, Set[str]]
 
 
-def parse(lines: List[str]) -> Tuple[Food, Allergens, Set[str]]:
+def parse(lines: List[str]) -> Puzzle:
     food = []
     allergens_map: Allergens = {}
     all_ingredients = set()
@@ -77,6 +79,21 @@ def to_alpha_list(mapping: Dict[str, str]) -> str:
     return ','.join(mapping[allergen] for allergen in sorted(mapping.keys()))
 
 
+def safe_count(puzzle: Puzzle) -> int:
+    food, allergens, ingredients = puzzle
+    return count_safe(food, ingredients - unsafe_ingredients(food, allergens))
+
+
+def dangerous_list(puzzle: Puzzle) -> str:
+    food, allergens, ingredients = puzzle
+    safe = ingredients - unsafe_ingredients(food, allergens)
+    return to_alpha_list(map_unsafe(food, safe, allergens))
+
+
+register(21, 1, lambda f: parse(load(f)), safe_count)
+register(21, 2, lambda f: parse(load(f)), dangerous_list)
+
+
 if __name__ == "__main__":
     the_food, the_allergens, the_ingredients = parse(load('day21-test.txt'))
     the_unsafe = unsafe_ingredients(the_food, the_allergens)
@@ -1,23 +1,18 @@
 #!/usr/bin/env python3
 import re
-from typing import List, Dict, Tuple, Set
+from typing import Iterable, List, Dict, Tuple, Set
 
-from util import load
+from registry import register
+from util import records, stream
 
 Hand = List[int]
 
 
-def parse(lines: List[str]) -> Tuple[Hand, Hand]:
+def parse(lines: Iterable[str]) -> Tuple[Hand, Hand]:
     p: List[Hand] = [[], []]
-    player = 0
-    for line in lines:
-        if line.startswith('Player'):
-            if line == 'Player 2:':
-                player = 1
-        elif not line:
-            continue
-        else:
-            p[player].append(int(line))
+    for record in records(lines):
+        player = 1 if record[0] == 'Player 2:' else 0
+        p[player].extend(int(line) for line in record[1:])
     return p[0], p[1]
 
 
@@ -62,19 +57,28 @@ def recursive_combat(h1: Hand, h2: Hand) -> Tuple[Hand, Hand]:
     return h1, h2
 
 
+def recursive_score(hands: Tuple[Hand, Hand]) -> int:
+    h1, h2 = recursive_combat(*hands)
+    return calc_score(h1 if h1 else h2)
+
+
+register(22, 1, lambda f: parse(stream(f)), lambda d: combat(*d))
+register(22, 2, lambda f: parse(stream(f)), recursive_score)
+
+
 if __name__ == "__main__":
-    hand1, hand2 = parse(load('day22-test.txt'))
+    hand1, hand2 = parse(stream('day22-test.txt'))
     assert combat(hand1, hand2) == 306
 
-    hand1, hand2 = parse(load('day22-test.txt'))
+    hand1, hand2 = parse(stream('day22-test.txt'))
     hand1, hand2 = recursive_combat(hand1, hand2)
     assert calc_score(hand1 if hand1 else hand2) == 291
 
-    hand1, hand2 = parse(load('day22.txt'))
+    hand1, hand2 = parse(stream('day22.txt'))
     score = combat(hand1, hand2)
     print('Score is %d' % score)
 
-    hand1, hand2 = parse(load('day22.txt'))
+    hand1, hand2 = parse(stream('day22.txt'))
     hand1, hand2 = recursive_combat(hand1, hand2)
     score = calc_score(hand1 if hand1 else hand2)
     print('Score is %d' % score)
@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
 from typing import List, Dict, Tuple
 
+from registry import register
+from util import load
+
 
 def play(cups: List[int], rounds: int) -> List[int]:
     num_cups = len(cups)
@@ -106,6 +109,16 @@ def to_result(cups: List[int]) -> str:
     return ''.join(str(i) for i in cups[idx + 1:] + cups[:idx])
 
 
+def cups_product(data: str, max_num=1_000_000, rounds=10_000_000) -> int:
+    result = play2(to_linked_list(data, max_num), int(data[0]), max_num, rounds)
+    return result[0] * result[1]
+
+
+register(23, 1, lambda f: load(f)[0],
+         lambda d: to_result(play(parse(d), 100)))
+register(23, 2, lambda f: load(f)[0], cups_product)
+
+
 if __name__ == "__main__":
     # part 1
     assert to_result(play(parse('389125467'), 10)) == '92658374'
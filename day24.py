@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 from typing import List, Tuple, Dict, Callable
 
-from day17 import GameOfLife, State
+from day17 import GameOfLife, State, active_after
+from registry import register
 from util import load
 
 Coord = Tuple[int, int]
@@ -41,6 +42,10 @@ class GameOfLifeHex(GameOfLife):
                 self._set_activity((x, y), True)
 
 
+register(24, 1, load, lambda d: GameOfLifeHex(d).active())
+register(24, 2, load, lambda d: active_after(GameOfLifeHex(d), 100))
+
+
 if __name__ == "__main__":
     data = load('day24-test.txt')
     gol = GameOfLifeHex(data)
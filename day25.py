@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
-from typing import Tuple
+from typing import Sequence, Tuple
 
-from util import load, as_int
+from registry import register
+from util import load_ints
 
 Rfid = Tuple[int, int]  # public key and loop count
 
@@ -30,13 +31,20 @@ def encryption_key(card: Rfid, door: Rfid) -> int:
     return card_key
 
 
+def crack(pub_keys: Sequence[int]) -> int:
+    card_rfid = pub_keys[0], guess_loops(7, pub_keys[0])
+    door_rfid = pub_keys[1], guess_loops(7, pub_keys[1])
+    return encryption_key(card_rfid, door_rfid)
+
+
+register(25, 1, load_ints, crack)
+
+
 if __name__ == "__main__":
     assert guess_loops(7, 5764801) == 8
     assert guess_loops(7, 17807724) == 11
     assert encryption_key((5764801, 8), (17807724, 11)) == 14897079
 
-    pub_keys = as_int(load('day25.txt'))
-    card_rfid = pub_keys[0], guess_loops(7, pub_keys[0])
-    door_rfid = pub_keys[1], guess_loops(7, pub_keys[1])
-    key = encryption_key(card_rfid, door_rfid)
+    pub_keys = load_ints('day25.txt')
+    key = crack(pub_keys)
     print('Encryption key is %d' % key)
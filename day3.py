@@ -1,7 +1,13 @@
 #!/usr/bin/env python3
+from typing import Iterable, List, Tuple
 
+from registry import register
 from util import *
 
+SLOPES = [(1, 1), (3, 1), (5, 1), (7, 1), (1, 2)]
+
+TREE_BITS = str.maketrans('.#', '01')
+
 
 def down_hill(m, dx, dy):
     num = 0
@@ -18,6 +24,37 @@ def down_hill(m, dx, dy):
     return num
 
 
+# Row as a bitmap, bit x is set when there's a tree at x
+def to_bits(row: str) -> int:
+    return int(row[::-1].translate(TREE_BITS), 2)
+
+
+# Trees for all slopes in a single pass over the rows, which can be
+# streamed as only one row is looked at at a time.
+def count_trees_multi(rows: Iterable[str],
+                      slopes: List[Tuple[int, int]]) -> List[int]:
+    counts = [0] * len(slopes)
+    width = 0
+    for y, row in enumerate(rows):
+        width = width or len(row)
+        bits = to_bits(row)
+        for i, (dx, dy) in enumerate(slopes):
+            if y % dy == 0 and (bits >> (y // dy * dx) % width) & 1:
+                counts[i] += 1
+    return counts
+
+
+def tree_product(m, slopes) -> int:
+    product = 1
+    for trees in count_trees_multi(m, slopes):
+        product *= trees
+    return product
+
+
+register(3, 1, load, lambda m: down_hill(m, 3, 1))
+register(3, 2, load, lambda m: tree_product(m, SLOPES))
+
+
 if __name__ == "__main__":
     map = load('day3.txt')
 
@@ -25,8 +62,9 @@ if __name__ == "__main__":
     assert trees == 151
     print("Number of trees: %d" % trees)
 
-    product = 1
-    for slope in [(1, 1), (3, 1), (5, 1), (7, 1), (1, 2)]:
-        trees = down_hill(map, *slope)
-        product *= trees
+    product = tree_product(map, SLOPES)
+    assert product == 7540141059
+    assert product == tree_product(stream('day3.txt'), SLOPES)
+    assert count_trees_multi(map, SLOPES) == \
+           [down_hill(map, *slope) for slope in SLOPES]
     print("Tree product: %d" % product)
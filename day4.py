@@ -1,103 +1,135 @@
 #!/usr/bin/env python3
 import re
-from typing import List
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
-from util import load
+from registry import register
+from util import records, stream
 
 REQ_FLD = ['byr', 'iyr', 'eyr', 'hgt', 'hcl', 'ecl', 'pid']
 OPT_FLD = ['cid']
+FIELDS = set(REQ_FLD + OPT_FLD)
 
 HGT_REGEX = re.compile(r'^(\d+)(cm|in)$')
 HCL_REGEX = re.compile(r'^#[0-9a-f]{6}$')
 PID_REGEX = re.compile(r'^[0-9]{9}$')
 ECL_VALID = {'amb', 'blu', 'brn', 'gry', 'grn', 'hzl', 'oth'}
 
+Rule = Tuple[str, Callable[[str], bool]]
 
+
+def _number_between(low: int, high: int) -> Callable[[str], bool]:
+    def check(val: str) -> bool:
+        try:
+            return low <= int(val) <= high
+        except ValueError:
+            return False
+
+    return check
+
+
+_CM = _number_between(150, 193)
+_IN = _number_between(59, 76)
+
+
+def _valid_hgt(val: str) -> bool:
+    m = HGT_REGEX.match(val)
+    if not m:
+        return False
+    return (_CM if m.group(2) == 'cm' else _IN)(m.group(1))
+
+
+PRESENCE_RULES: List[Rule] = [(k, lambda v: True) for k in REQ_FLD]
+
+# Field rules, cheapest first
+RULES: List[Rule] = [
+    ('ecl', ECL_VALID.__contains__),
+    ('byr', _number_between(1920, 2002)),
+    ('iyr', _number_between(2010, 2020)),
+    ('eyr', _number_between(2020, 2030)),
+    ('pid', lambda v: PID_REGEX.match(v) is not None),
+    ('hcl', lambda v: HCL_REGEX.match(v) is not None),
+    ('hgt', _valid_hgt),
+]
+
+
+# Known fields are slots, any other fields are kept aside in `extra`
 class Passport:
+    __slots__ = REQ_FLD + OPT_FLD + ['extra']
+
     def __init__(self):
-        self._data = {}
+        for k in FIELDS:
+            setattr(self, k, None)
+        self.extra: Optional[Dict[str, str]] = None
 
     def __repr__(self):
-        return str(self._data)
+        data = {k: getattr(self, k) for k in REQ_FLD + OPT_FLD
+                if getattr(self, k) is not None}
+        data.update(self.extra or {})
+        return str(data)
 
     def add_data(self, data: List[str]):
         for d in data:
             k, v = d.split(':')
-            self._data[k] = v
+            if k in FIELDS:
+                setattr(self, k, v)
+            else:
+                if self.extra is None:
+                    self.extra = {}
+                self.extra[k] = v
 
     def is_valid_1(self):
-        for k in REQ_FLD:
-            if k not in self._data:
-                return False
-        return True
+        return rejected_by(self, PRESENCE_RULES) is None
 
-    @staticmethod
-    def _number_between(val, low, high):
-        try:
-            num = int(val)
-            return low <= num <= high
-        except ValueError:
-            return False
-
-    def valid_byr(self):
-        return self._number_between(self._data['byr'], 1920, 2002)
-
-    def valid_iyr(self):
-        return self._number_between(self._data['iyr'], 2010, 2020)
+    def is_valid_2(self):
+        return rejected_by(self, RULES) is None
 
-    def valid_eyr(self):
-        return self._number_between(self._data['eyr'], 2020, 2030)
 
-    def valid_hgt(self):
-        m = re.match(HGT_REGEX, self._data['hgt'])
-        if not m:
-            return False
-        if m.group(2) == 'cm':
-            return self._number_between(m.group(1), 150, 193)
-        elif m.group(2) == 'in':
-            return self._number_between(m.group(1), 59, 76)
-        else:
-            return False
+# The field of the first rule the passport fails, None if it passes them all
+def rejected_by(pp: Passport, rules: List[Rule]) -> Optional[str]:
+    for field, check in rules:
+        val = getattr(pp, field)
+        if val is None or not check(val):
+            return field
+    return None
 
-    def valid_hcl(self):
-        return re.match(HCL_REGEX, self._data['hcl'])
 
-    def valid_ecl(self):
-        return self._data['ecl'] in ECL_VALID
+# Validates passports against a table of rules, stopping at the first
+# rule that fails. Rejections are counted per field, missing fields
+# count against the field as well.
+class Validator:
+    def __init__(self, rules: List[Rule]):
+        self._rules = rules
+        self.rejections: Counter = Counter()
 
-    def valid_pid(self):
-        return re.match(PID_REGEX, self._data['pid'])
+    def is_valid(self, pp: Passport) -> bool:
+        field = rejected_by(pp, self._rules)
+        if field is not None:
+            self.rejections[field] += 1
+        return field is None
 
-    def is_valid_2(self):
-        return self.is_valid_1() \
-               and self.valid_byr() \
-               and self.valid_iyr() \
-               and self.valid_eyr() \
-               and self.valid_hgt() \
-               and self.valid_hcl() \
-               and self.valid_ecl() \
-               and self.valid_pid()
+    def validate(self, passports: Iterable[Passport]) -> List[Passport]:
+        return [pp for pp in passports if self.is_valid(pp)]
 
 
-def parse(data) -> List[Passport]:
+def parse(data: Iterable[str]) -> List[Passport]:
     pp_list = []
-    pp = None
-    for line in data:
-        if len(line) == 0:
-            if pp:
-                pp_list.append(pp)
-                pp = None
-        else:
-            if not pp:
-                pp = Passport()
+    for record in records(data):
+        pp = Passport()
+        for line in record:
             pp.add_data(line.split(' '))
-    if pp:
         pp_list.append(pp)
     return pp_list
 
 
+register(4, 1, lambda f: parse(stream(f)),
+         lambda d: len(Validator(PRESENCE_RULES).validate(d)))
+register(4, 2, lambda f: parse(stream(f)),
+         lambda d: len(Validator(RULES).validate(d)))
+
+
 if __name__ == "__main__":
-    passports = parse(load('day4.txt'))
+    passports = parse(stream('day4.txt'))
 
     valid_pp = list(filter(lambda p: p.is_valid_1(), passports))
     assert len(valid_pp) == 235
@@ -106,3 +138,13 @@ if __name__ == "__main__":
     valid_pp = list(filter(lambda p: p.is_valid_2(), passports))
     assert len(valid_pp) == 194
     print("Valid passports: %d/%d" % (len(valid_pp), len(passports)))
+
+    validator = Validator(RULES)
+    assert len(validator.validate(passports)) == 194
+    assert sum(validator.rejections.values()) == len(passports) - 194
+    print("Rejections: %s" % dict(validator.rejections))
+
+    passport = parse(['ecl:gry pid:860033327 eyr:2020 hcl:#fffffd xyz:1',
+                      'byr:1937 iyr:2017 cid:147 hgt:183cm'])[0]
+    assert passport.extra == {'xyz': '1'}
+    assert passport.is_valid_1() and passport.is_valid_2()
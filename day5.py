@@ -1,15 +1,46 @@
 #!/usr/bin/env python3
+import os
+from array import array
+from typing import Sequence
 
-from util import load
+from registry import register
+from util import DATA_DIR, load
 
 ROW_TR = str.maketrans("FB", "01")
 COL_TR = str.maketrans("LR", "01")
+SEAT_BITS = bytes.maketrans(b'FBLR', b'0101')
 
 
-def code_to_pos(code: str) -> (int, int, int):
-    row = int(code[:7].translate(ROW_TR), 2)
-    column = int(code[7:].translate(COL_TR), 2)
-    return row, column, row * 8 + column
+def code_to_pos(code: str, col_bits=3) -> (int, int, int):
+    row = int(code[:-col_bits].translate(ROW_TR), 2)
+    column = int(code[-col_bits:].translate(COL_TR), 2)
+    return row, column, (row << col_bits) + column
+
+
+# The seat ID is just the whole code read as a binary number, so the
+# whole buffer is translated at once. Planes with more than 16 bits of
+# seats get 64-bit IDs, and a list of Python ints beyond 64 bits.
+def decode_seats(buffer: bytes, bits=10) -> Sequence[int]:
+    codes = buffer.translate(SEAT_BITS).split()
+    if bits > 64:
+        return [int(c, 2) for c in codes]
+    return array('H' if bits <= 16 else 'Q', (int(c, 2) for c in codes))
+
+
+def seat_ids(filename: str, bits=10) -> Sequence[int]:
+    with open(os.path.join(DATA_DIR, filename), 'rb') as f:
+        return decode_seats(f.read(), bits)
+
+
+# The only seat missing from a consecutive range, i.e. the difference
+# between the sum of the full range and the sum of the IDs.
+def missing_seat(ids: Sequence[int]) -> int:
+    low, high = min(ids), max(ids)
+    return (low + high) * (high - low + 1) // 2 - sum(ids)
+
+
+register(5, 1, seat_ids, max)
+register(5, 2, seat_ids, missing_seat)
 
 
 if __name__ == "__main__":
@@ -17,6 +48,11 @@ if __name__ == "__main__":
     assert code_to_pos('BFFFBBFRRR') == (70, 7, 567)
     assert code_to_pos('FFFBBBFRRR') == (14, 7, 119)
     assert code_to_pos('BBFFBBFRLL') == (102, 4, 820)
+    assert code_to_pos('BBFFBBFRLLR', 4) == (102, 9, 1641)
+    assert list(decode_seats(b'FBFBBFFRLR\nBFFFBBFRRR\n')) == [357, 567]
+    assert missing_seat(decode_seats(b'BFFFBBFRRR\nBFFFBBFRLR\n'
+                                     b'BFFFBBFRLL\n')) == 566
+    assert decode_seats(b'B' * 70 + b'\n', 70) == [(1 << 70) - 1]
 
     lines = load('day5.txt')
     positions = list(map(code_to_pos, lines))
@@ -26,10 +62,7 @@ if __name__ == "__main__":
     assert max_id[2] == 980
     print("Lowest/highest seat ID : %d/%d" % (min_id[2], max_id[2]))
 
-    seat_ids = set(map(lambda p: p[2], positions))
-    seat_id = -1
-    for seat_id in range(min_id[2], max_id[2]):
-        if seat_id not in seat_ids:
-            break
+    seat_id = missing_seat([p[2] for p in positions])
     assert seat_id == 607
+    assert seat_id == missing_seat(seat_ids('day5.txt'))
     print("Your seat ID: %d" % seat_id)
@@ -1,44 +1,59 @@
 #!/usr/bin/env python3
-from typing import List
+from functools import reduce
+from operator import or_
+from string import ascii_lowercase
+from typing import Iterable, Tuple
 
-from util import load
+from registry import register
+from util import load, stream
 
+BITS = {c: 1 << i for i, c in enumerate(ascii_lowercase)}
+ALL = (1 << len(ascii_lowercase)) - 1
 
-def part1(data: List[str]) -> int:
-    total = 0
-    group = set()
-    for line in data:
-        if line == '':
-            total += len(group)
-            group = set()
-        else:
-            group |= set(line)
-    total += len(group)
-    return total
-
-
-def part2(data: List[str]) -> int:
-    total = 0
-    group = None
+
+def to_mask(line: str) -> int:
+    return reduce(or_, map(BITS.__getitem__, line), 0)
+
+
+# Questions answered by anyone and by everyone, summed over all groups.
+# Groups are folded as they come in, so the input can be streamed.
+def count_answers(data: Iterable[str]) -> Tuple[int, int]:
+    anyone = everyone = 0
+    group_or, group_and = 0, ALL
+    in_group = False
     for line in data:
-        if line == '':
-            total += len(group)
-            group = None
-        elif group is None:
-            group = set(line)
-        else:
-            group &= set(line)
-    total += len(group)
-    return total
+        if line:
+            mask = to_mask(line)
+            group_or |= mask
+            group_and &= mask
+            in_group = True
+        elif in_group:
+            anyone += group_or.bit_count()
+            everyone += group_and.bit_count()
+            group_or, group_and = 0, ALL
+            in_group = False
+    if in_group:
+        anyone += group_or.bit_count()
+        everyone += group_and.bit_count()
+    return anyone, everyone
 
 
-if __name__ == "__main__":
-    lines = load('day6.txt')
+def part1(data: Iterable[str]) -> int:
+    return count_answers(data)[0]
+
 
-    count = part1(lines)
-    assert count == 6748
-    print('Count = %d' % count)
+def part2(data: Iterable[str]) -> int:
+    return count_answers(data)[1]
+
+
+register(6, 1, load, part1)
+register(6, 2, load, part2)
+
+
+if __name__ == "__main__":
+    anyone, everyone = count_answers(stream('day6.txt'))
+    assert anyone == 6748
+    print('Count = %d' % anyone)
 
-    count = part2(lines)
-    assert count == 3445
-    print('Count = %d' % count)
+    assert everyone == 3445
+    print('Count = %d' % everyone)
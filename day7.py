@@ -1,12 +1,21 @@
 #!/usr/bin/env python3
+import hashlib
+import os
 import re
-from functools import reduce
-from typing import List, Tuple, Dict, Set
+import struct
+import tempfile
+from array import array
+from functools import cached_property
+from typing import Iterable, Iterator, List, Tuple, Dict, Set
 
-from util import load
+from registry import register
+from util import DATA_DIR, load
 
 LINE_REGEX = re.compile(r'^(.*) contain (.*)\.$')
 BAG_REGEX = re.compile(r'((?:[0-9]+) )?(.*) bags?')
+# Both the container and each of its contents in one pass over the input
+TOKEN_REGEX = re.compile(r'^(?P<container>.+?) bags contain |'
+                         r'(?P<num>\d+) (?P<bag>.+?) bags?[,.]', re.MULTILINE)
 
 
 def parse_bag(bag: str) -> (int, str):
@@ -34,26 +43,6 @@ def build_containment_tree(lines: [str]) -> Dict[str, List[str]]:
     return tree
 
 
-def traverse_part_1(tree: Dict[str, List[str]], bag: str) -> Set[str]:
-    if bag not in tree:
-        return {bag}  # found outer container
-    else:
-        return set(tree[bag]) | \
-               reduce(lambda x, y: x | y,
-                      map(lambda b: traverse_part_1(tree, b), tree[bag]))
-
-
-def part1(file: str) -> int:
-    data = load(file)
-    t = build_containment_tree(data)
-    assert 'shiny gold' in t
-    colours = traverse_part_1(t, 'shiny gold')
-    # print(colours)
-    solution = len(colours)
-    print('Part 1 bag count: %d' % solution)
-    return solution
-
-
 def build_container_tree(lines: [str]) -> Dict[str, List[Tuple[int, str]]]:
     tree = {}
     for line in lines:
@@ -64,35 +53,346 @@ def build_container_tree(lines: [str]) -> Dict[str, List[Tuple[int, str]]]:
     return tree
 
 
-def traverse_part_2(tree: Dict[str, List[Tuple[int, str]]], bag: str) -> int:
-    if bag not in tree:
-        return 0
-    else:
-        return 1 + sum(map(lambda b: b[0] * traverse_part_2(tree, b[1]), tree[bag]))
+Rule = Tuple[str, List[Tuple[int, str]]]
+
+
+# Bag rules as a graph of interned colours with forward (container to
+# contents) and reverse adjacency in CSR arrays. Everything is computed
+# iteratively over a topological order, so deep rule sets don't hit the
+# recursion limit, and a cycle in the rules is reported instead of
+# recursing forever. Rules that are already interned (ParsedRules) go in as
+# (container, content, quantity) edges between colour ids.
+class BagGraph:
+    def __init__(self, rules: Iterable[Rule]):
+        ids: Dict[str, int] = {}
+        names: List[str] = []
+
+        def intern(colour: str) -> int:
+            if colour not in ids:
+                ids[colour] = len(names)
+                names.append(colour)
+            return ids[colour]
+
+        edges = []
+        for container, contents in rules:
+            src = intern(container)
+            for num, bag in contents:
+                if num:
+                    edges.append((src, intern(bag), num))
+        self._build(names, edges)
+
+    @classmethod
+    def from_edges(cls, names: List[str],
+                   edges: Iterable[Tuple[int, int, int]]) -> 'BagGraph':
+        graph = cls.__new__(cls)
+        graph._build(names, [e for e in edges if e[2]])
+        return graph
+
+    def _build(self, names: List[str], edges: List[Tuple[int, int, int]]):
+        self._names = names
+        self._ids = {name: i for i, name in enumerate(names)}
+        n = len(names)
+        self._fwd_offsets, self._fwd, self._qty = \
+            self._csr(n, edges)
+        self._rev_offsets, self._rev, _ = \
+            self._csr(n, [(d, s, 0) for s, d, q in edges])
+        self._order = self._topological_order()
+        self._contained = self._count_contained()
+        self._containers: Dict[int, Set[str]] = {}
+
+    @staticmethod
+    def _csr(n: int, edges: List[Tuple[int, int, int]]) \
+            -> Tuple[array, array, array]:
+        offsets = array('q', [0] * (n + 1))
+        for s, _, _ in edges:
+            offsets[s + 1] += 1
+        for i in range(n):
+            offsets[i + 1] += offsets[i]
+        targets = array('q', [0] * len(edges))
+        weights = array('q', [0] * len(edges))
+        fill = array('q', offsets[:-1])
+        for s, d, w in edges:
+            targets[fill[s]] = d
+            weights[fill[s]] = w
+            fill[s] += 1
+        return offsets, targets, weights
+
+    def _children(self, v: int) -> range:
+        return range(self._fwd_offsets[v], self._fwd_offsets[v + 1])
+
+    # Containers before their contents
+    def _topological_order(self) -> array:
+        n = len(self._names)
+        in_degree = array('q', [0] * n)
+        for d in self._fwd:
+            in_degree[d] += 1
+        order = array('q', (v for v in range(n) if in_degree[v] == 0))
+        i = 0
+        while i < len(order):
+            for e in self._children(order[i]):
+                d = self._fwd[e]
+                in_degree[d] -= 1
+                if in_degree[d] == 0:
+                    order.append(d)
+            i += 1
+        if len(order) != n:
+            raise RuntimeError('bag rules contain a cycle')
+        return order
+
+    def _count_contained(self) -> List[int]:
+        contained = [0] * len(self._names)
+        for v in reversed(self._order):
+            contained[v] = sum(self._qty[e] * (1 + contained[self._fwd[e]])
+                               for e in self._children(v))
+        return contained
+
+    def __contains__(self, colour: str) -> bool:
+        return colour in self._ids
+
+    # Number of bags inside one bag of the given colour
+    def contained(self, colour: str) -> int:
+        return self._contained[self._ids[colour]]
+
+    def contained_batch(self, colours: Iterable[str]) -> List[int]:
+        return [self.contained(c) for c in colours]
+
+    # Colours that (eventually) contain the given colour, found by walking
+    # the reverse edges
+    def containers(self, colour: str) -> Set[str]:
+        v = self._ids[colour]
+        if v not in self._containers:
+            seen = set()
+            todo = [v]
+            while todo:
+                u = todo.pop()
+                for e in range(self._rev_offsets[u], self._rev_offsets[u + 1]):
+                    p = self._rev[e]
+                    if p not in seen:
+                        seen.add(p)
+                        todo.append(p)
+            self._containers[v] = {self._names[p] for p in seen}
+        return self._containers[v]
+
+    # One pass over the graph for all colours together: every colour gets
+    # a bitmask of the queried colours it contains, built up from the
+    # contents, so each query is a bit.
+    def containers_batch(self, colours: Iterable[str]) -> List[Set[str]]:
+        colours = list(colours)
+        todo = [self._ids[c] for c in colours
+                if self._ids[c] not in self._containers]
+        if todo:
+            bit = [0] * len(self._names)
+            for i, v in enumerate(todo):
+                bit[v] |= 1 << i
+            mask = [0] * len(self._names)
+            for v in reversed(self._order):
+                m = 0
+                for e in self._children(v):
+                    d = self._fwd[e]
+                    m |= mask[d] | bit[d]
+                mask[v] = m
+            found = [set() for _ in todo]
+            for v, m in enumerate(mask):
+                while m:
+                    low = m & -m
+                    found[low.bit_length() - 1].add(self._names[v])
+                    m ^= low
+            for v, f in zip(todo, found):
+                self._containers[v] = f
+        return [self._containers[self._ids[c]] for c in colours]
+
+
+# All rules of an input, parsed once. Colours are interned and the rules
+# kept in CSR arrays (container, offsets, contents, quantities), which is
+# also the layout of the binary cache file.
+class ParsedRules:
+    MAGIC = b'BAG1'
+    HEADER = struct.Struct('<4sQQQ')
+
+    def __init__(self, names: List[str], containers: array, offsets: array,
+                 contents: array, quantities: array):
+        self._names = names
+        self._containers = containers
+        self._offsets = offsets
+        self._contents = contents
+        self._quantities = quantities
+
+    @classmethod
+    def parse(cls, text: str) -> 'ParsedRules':
+        ids: Dict[str, int] = {}
+        names: List[str] = []
+
+        def intern(colour: str) -> int:
+            if colour not in ids:
+                ids[colour] = len(names)
+                names.append(colour)
+            return ids[colour]
+
+        containers, offsets = array('q'), array('q', [0])
+        contents, quantities = array('q'), array('q')
+        for m in TOKEN_REGEX.finditer(text):
+            if m.group('container'):
+                if containers:
+                    offsets.append(len(contents))
+                containers.append(intern(m.group('container')))
+            else:
+                contents.append(intern(m.group('bag')))
+                quantities.append(int(m.group('num')))
+        if containers:
+            offsets.append(len(contents))
+        return cls(names, containers, offsets, contents, quantities)
 
+    def to_bytes(self) -> bytes:
+        names = '\n'.join(self._names).encode()
+        return self.HEADER.pack(self.MAGIC, len(self._containers),
+                                len(self._contents), len(names)) + \
+            self._containers.tobytes() + self._offsets.tobytes() + \
+            self._contents.tobytes() + self._quantities.tobytes() + names
 
-def part2(file: str) -> int:
-    data = load(file)
-    t = build_container_tree(data)
-    assert 'shiny gold' in t
-    # print(t)
-    cnt = traverse_part_2(t, 'shiny gold') - 1  # don't count the 'shiny gold'
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'ParsedRules':
+        if len(data) < cls.HEADER.size:
+            raise RuntimeError('not a bag rules cache')
+        magic, num_rules, num_contents, names_len = \
+            cls.HEADER.unpack_from(data)
+        if magic != cls.MAGIC:
+            raise RuntimeError('not a bag rules cache')
+        size = cls.HEADER.size + names_len + \
+            (2 * num_rules + 1 + 2 * num_contents) * array('q').itemsize
+        if len(data) != size:
+            raise RuntimeError('bag rules cache of %d bytes, expected %d' %
+                               (len(data), size))
+        pos = cls.HEADER.size
+        arrays = []
+        for length in (num_rules, num_rules + 1, num_contents, num_contents):
+            a = array('q')
+            a.frombytes(data[pos:pos + length * a.itemsize])
+            pos += length * a.itemsize
+            arrays.append(a)
+        names = data[pos:pos + names_len].decode().split('\n')
+        return cls(names, *arrays)
+
+    # Parses the input file, or reads the parsed form from the cache
+    # directory when the same input was parsed before. A cache file is
+    # written aside and moved into place, so it's never seen half written.
+    @classmethod
+    def load(cls, filename: str, cache_dir: str = None) -> 'ParsedRules':
+        with open(os.path.join(DATA_DIR, filename), 'rb') as f:
+            data = f.read()
+        if not cache_dir:
+            return cls.parse(data.decode())
+        cached = os.path.join(cache_dir,
+                              hashlib.sha256(data).hexdigest() + '.bag')
+        if os.path.exists(cached):
+            with open(cached, 'rb') as f:
+                return cls.from_bytes(f.read())
+        rules = cls.parse(data.decode())
+        os.makedirs(cache_dir, exist_ok=True)
+        f = tempfile.NamedTemporaryFile(dir=cache_dir, suffix='.tmp',
+                                        delete=False)
+        try:
+            with f:
+                f.write(rules.to_bytes())
+            os.replace(f.name, cached)
+        except OSError:
+            os.unlink(f.name)
+            raise
+        return rules
+
+    def __iter__(self) -> Iterator[Rule]:
+        names = self._names
+        for i, container in enumerate(self._containers):
+            span = range(self._offsets[i], self._offsets[i + 1])
+            yield names[container], [(self._quantities[e],
+                                      names[self._contents[e]])
+                                     for e in span]
+
+    # (container, content, quantity) for every content of every rule
+    def edges(self) -> Iterator[Tuple[int, int, int]]:
+        for i, container in enumerate(self._containers):
+            for e in range(self._offsets[i], self._offsets[i + 1]):
+                yield container, self._contents[e], self._quantities[e]
+
+    @cached_property
+    def graph(self) -> BagGraph:
+        return BagGraph.from_edges(self._names, self.edges())
+
+    @cached_property
+    def containment_tree(self) -> Dict[str, List[str]]:
+        tree = {}
+        for container, contents in self:
+            for num, bag in contents:
+                tree.setdefault(bag, []).append(container)
+        return tree
+
+    @cached_property
+    def container_tree(self) -> Dict[str, List[Tuple[int, str]]]:
+        tree = {}
+        for container, contents in self:
+            tree.setdefault(container, []).extend(contents)
+        return tree
+
+
+def _graph(rules: Iterable[Rule]) -> BagGraph:
+    return rules.graph if isinstance(rules, ParsedRules) else BagGraph(rules)
+
+
+def count_containers(rules: Iterable[Rule]) -> int:
+    graph = _graph(rules)
+    assert 'shiny gold' in graph
+    return len(graph.containers('shiny gold'))
+
+
+def part1(rules: Iterable[Rule]) -> int:
+    solution = count_containers(rules)
+    print('Part 1 bag count: %d' % solution)
+    return solution
+
+
+def count_contents(rules: Iterable[Rule]) -> int:
+    graph = _graph(rules)
+    assert 'shiny gold' in graph
+    return graph.contained('shiny gold')
+
+
+def part2(rules: Iterable[Rule]) -> int:
+    cnt = count_contents(rules)
     print('Part 2 bag count: %d' % cnt)
     return cnt
 
 
-if __name__ == "__main__":
-    c = part1('day7-test.txt')
-    assert c == 4
+register(7, 1, ParsedRules.load, count_containers)
+register(7, 2, ParsedRules.load, count_contents)
 
-    c = part1('day7.txt')
-    assert c == 148
 
-    c = part2('day7-test.txt')
+if __name__ == "__main__":
+    rules = ParsedRules.load('day7-test.txt')
+    c = part1(rules)
+    assert c == 4
+    c = part2(rules)
     assert c == 32
 
-    c = part2('day7-test2.txt')
+    c = part2(ParsedRules.load('day7-test2.txt'))
     assert c == 126
 
-    c = part2('day7.txt')
+    rules = ParsedRules.load('day7.txt')
+    c = part1(rules)
+    assert c == 148
+    c = part2(rules)
     assert c == 24867
+    assert count_contents(list(rules)) == c
+
+    g = BagGraph(map(parse_line, load('day7-test.txt')))
+    assert g.containers_batch(['shiny gold', 'dark olive']) == [
+        {'bright white', 'muted yellow', 'dark orange', 'light red'},
+        {'shiny gold', 'bright white', 'muted yellow', 'dark orange',
+         'light red'}]
+    assert g.contained_batch(['shiny gold', 'faded blue']) == [32, 0]
+
+    lines = load('day7.txt')
+    assert list(rules) == [(container, [c for c in contents if c[0]])
+                           for container, contents in map(parse_line, lines)]
+    assert rules.containment_tree.keys() == \
+           build_containment_tree(lines).keys() - {'no other'}
+    assert ParsedRules.from_bytes(rules.to_bytes()).container_tree == \
+           rules.container_tree
@@ -1,82 +1,185 @@
 #!/usr/bin/env python3
-import re
+from array import array
+from collections import deque
+from typing import Callable, Dict, Iterable, Optional
 
+from registry import register
 from util import load
 
+ACC, JMP, NOP = 0, 1, 2
+OPCODES = {'acc': ACC, 'jmp': JMP, 'nop': NOP}
 
-class Instruction:
-    LINE_REGEX = re.compile(r'^([a-z]+) ([-+0-9]+)$')
 
-    def __init__(self, line):
-        m = re.match(self.LINE_REGEX, line)
-        if not m:
-            raise RuntimeError
-        self._op = m.group(1)
-        self._arg = int(m.group(2))
-        self._executed = False
+# Collects execution statistics of the last run of a traced program:
+# executions per opcode, hits per instruction and the last (ip, acc)
+# states, and calls back on loop detection (ip, acc) and termination (acc).
+class Tracer:
+    def __init__(self, history=16,
+                 on_loop: Callable[[int, int], None] = None,
+                 on_terminate: Callable[[int], None] = None):
+        self.op_counts = [0] * len(OPCODES)
+        self.hits = array('l')
+        self.history = deque(maxlen=history)
+        self.on_loop = on_loop
+        self.on_terminate = on_terminate
 
-    def __repr__(self):
-        return '(%c) %s %d' % ('*' if self._executed else ' ', self._op, self._arg)
+    def reset(self, size: int):
+        self.op_counts = [0] * len(OPCODES)
+        self.hits = array('l', [0] * size)
+        self.history.clear()
 
-    def set_executed(self, value=True):
-        self._executed = value
-
-    def get_executed(self) -> bool:
-        return self._executed
+    def opcode_counts(self) -> Dict[str, int]:
+        return {name: self.op_counts[op] for name, op in OPCODES.items()}
 
 
+# The program is compiled into parallel opcode and argument arrays. With a
+# tracer, a separate instrumented interpreter loop is selected when
+# compiling, so the plain loop doesn't pay for tracing.
 class Program:
-    def __init__(self, file: str):
-        self._program = []
-        self._ip = 0
-        self._acc = 0
+    def __init__(self, file: str, tracer: Optional[Tracer] = None):
+        self._ops = array('b')
+        self._args = array('l')
+        self._tracer = tracer
         self.load(file)
 
     def load(self, file: str):
-        lines = load(file)
-        self._program = list(map(Instruction, lines))
-
-    def reset(self):
-        self._ip = 0
-        self._acc = 0
-        for instr in self._program:
-            instr.set_executed(False)
+        self.compile(load(file))
+
+    def compile(self, lines: Iterable[str]):
+        self._ops = array('b')
+        self._args = array('l')
+        for line in lines:
+            op, arg = line.split(' ')
+            if op not in OPCODES:
+                raise RuntimeError(line)
+            self._ops.append(OPCODES[op])
+            self._args.append(int(arg))
+        if self._tracer is None:
+            self._execute = self._execute_plain
+        else:
+            self._execute = self._execute_traced
+
+    def __len__(self):
+        return len(self._ops)
+
+    def _execute_plain(self) -> (bool, int, int):
+        ops, args = self._ops, self._args
+        end = len(ops)
+        visited = bytearray(end)
+        ip = acc = 0
+        while 0 <= ip < end:
+            if visited[ip]:
+                return False, ip, acc
+            visited[ip] = 1
+            op = ops[ip]
+            if op == ACC:
+                acc += args[ip]
+                ip += 1
+            elif op == JMP:
+                ip += args[ip]
+            else:
+                ip += 1
+        return ip >= end, ip, acc
+
+    def _execute_traced(self) -> (bool, int, int):
+        ops, args = self._ops, self._args
+        tracer = self._tracer
+        tracer.reset(len(ops))
+        op_counts, hits, history = tracer.op_counts, tracer.hits, tracer.history
+        end = len(ops)
+        visited = bytearray(end)
+        ip = acc = 0
+        while 0 <= ip < end:
+            if visited[ip]:
+                if tracer.on_loop:
+                    tracer.on_loop(ip, acc)
+                return False, ip, acc
+            visited[ip] = 1
+            history.append((ip, acc))
+            hits[ip] += 1
+            op = ops[ip]
+            op_counts[op] += 1
+            if op == ACC:
+                acc += args[ip]
+                ip += 1
+            elif op == JMP:
+                ip += args[ip]
+            else:
+                ip += 1
+        if ip >= end and tracer.on_terminate:
+            tracer.on_terminate(acc)
+        return ip >= end, ip, acc
 
     def run(self) -> (bool, int):
-        ok = False
-        while True:
-            instr: Instruction = self._program[self._ip]
-            # print('IP = %d, ACC = %d, %s' % (self._ip, self._acc, instr))
-            if instr.get_executed():
-                print('Detected infinite loop! (acc = %d)', self._acc)
-                break
-            instr.set_executed()
-            self._ip += 1
-            if 'acc' == instr._op:
-                self._acc += instr._arg
-            elif 'jmp' == instr._op:
-                self._ip += instr._arg - 1
-            if self._ip >= len(self._program):
-                print('Program terminated! (acc = %d)', self._acc)
-                ok = True
-                break
-        return ok, self._acc
-
+        ok, ip, acc = self._execute()
+        if ok:
+            print('Program terminated! (acc = %d)' % acc)
+        elif ip < 0:
+            print('Jumped before the start! (acc = %d)' % acc)
+        else:
+            print('Detected infinite loop! (acc = %d)' % acc)
+        return ok, acc
+
+    def _next(self, ip: int, flipped=False) -> int:
+        op = self._ops[ip]
+        if flipped:
+            op = NOP if op == JMP else JMP if op == NOP else op
+        return ip + self._args[ip] if op == JMP else ip + 1
+
+    # Instructions from which the program terminates, by walking the
+    # reverse edges back from the end. Jumps past the end count as the end,
+    # jumps before the start go nowhere.
+    def _terminating(self) -> bytearray:
+        end = len(self._ops)
+        nxt = array('l', (min(self._next(ip), end) for ip in range(end)))
+        offsets = array('l', [0] * (end + 2))
+        for t in nxt:
+            if t >= 0:
+                offsets[t + 1] += 1
+        for i in range(end + 1):
+            offsets[i + 1] += offsets[i]
+        targets = array('l', [0] * offsets[end + 1])
+        fill = array('l', offsets)
+        for ip, t in enumerate(nxt):
+            if t >= 0:
+                targets[fill[t]] = ip
+                fill[t] += 1
+        terminating = bytearray(end + 1)
+        terminating[end] = 1
+        todo = [end]
+        while todo:
+            t = todo.pop()
+            for e in range(offsets[t], offsets[t + 1]):
+                ip = targets[e]
+                if not terminating[ip]:
+                    terminating[ip] = 1
+                    todo.append(ip)
+        return terminating
+
+    # The corrupted instruction is the one on the looping path which, when
+    # flipped, continues into an instruction that terminates.
     def fix(self) -> int:
-        acc = -1
-        for i in range(0, len(self._program)):
-            self.reset()
-            instr: Instruction = self._program[i]
-            if 'acc' == instr._op:
-                continue
-            is_jmp = 'jmp' == instr._op
-            self._program[i]._op = 'nop' if is_jmp else 'jmp'
-            ok, acc = self.run()
-            self._program[i]._op = 'jmp' if is_jmp else 'nop'
-            if ok:
-                print('Fixed instruction %d' % i)
-                break
-        return acc
+        end = len(self._ops)
+        terminating = self._terminating()
+        visited = bytearray(end)
+        ip = 0
+        while 0 <= ip < end and not visited[ip]:
+            visited[ip] = 1
+            if self._ops[ip] != ACC:
+                t = self._next(ip, flipped=True)
+                if t >= end or (t >= 0 and terminating[t]):
+                    print('Fixed instruction %d' % ip)
+                    self._ops[ip] = NOP if self._ops[ip] == JMP else JMP
+                    try:
+                        return self.run()[1]
+                    finally:
+                        self._ops[ip] = NOP if self._ops[ip] == JMP else JMP
+            ip = self._next(ip)
+        return -1
+
+
+register(8, 1, Program, lambda p: p.run()[1])
+register(8, 2, Program, Program.fix)
 
 
 if __name__ == "__main__":
@@ -88,3 +191,18 @@ if __name__ == "__main__":
     result = program.fix()
     assert result == 2060
     print('Accumulator after normal termination: %d' % result)
+
+    loops = []
+    tracer = Tracer(4, on_loop=lambda ip, acc: loops.append((ip, acc)))
+    program = Program('day8.txt', tracer)
+    assert program.run() == (False, 1801)
+    assert len(loops) == 1 and loops[0][1] == 1801
+    assert sum(tracer.opcode_counts().values()) == sum(tracer.hits)
+    assert len(tracer.history) == 4 and max(tracer.hits) == 1
+    print('Executed: %s' % tracer.opcode_counts())
+    program.run()
+    program.fix()
+    assert max(tracer.hits) == 1 and sum(tracer.hits) < len(program)
+
+    program.compile(['acc +1', 'jmp -2', 'nop +0'])
+    assert program.run() == (False, 1) and program.fix() == 1
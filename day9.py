@@ -1,50 +1,92 @@
 #!/usr/bin/env python3
-from typing import List
+from collections import Counter, deque
+from typing import Iterable, Iterator, Sequence, Tuple
 
-from util import load, as_int
+from registry import register
+from util import load_ints, stream
 
 
-def preamble_sums(data: List[int], preamble) -> List[int]:
-    sums = []
-    for i in range(preamble):
-        for j in range(0, i):
-            sums.append(data[i] + data[j])
-    return sums
+def is_pair_sum(value: int, window: Iterable[int], counts: Counter) -> bool:
+    for v in window:
+        other = value - v
+        if other in counts and (other != v or counts[v] > 1):
+            return True
+    return False
 
 
-def analyse(data: List[int], preamble=25) -> int:
-    sums = preamble_sums(data, preamble)
-    for i in range(preamble, len(data)):
-        if data[i] not in sums:
-            return i
-        sums.extend([data[i] + data[j] for j in range(i - preamble + 1, i)])
-        sums = sums[min(preamble - 1, i - preamble + 1):]
+# Yields (index, number) for every number that isn't the sum of two of the
+# previous numbers in the window, as the numbers come in. The window is
+# kept as a multiset next to the values themselves.
+def validate(numbers: Iterable[int], preamble=25) -> Iterator[Tuple[int, int]]:
+    window = deque()
+    counts = Counter()
+    for i, n in enumerate(numbers):
+        if i >= preamble:
+            if not is_pair_sum(n, window, counts):
+                yield i, n
+            old = window.popleft()
+            counts[old] -= 1
+            if not counts[old]:
+                del counts[old]
+        window.append(n)
+        counts[n] += 1
+
+
+def analyse(data: Sequence[int], preamble=25) -> int:
+    for i, _ in validate(data, preamble):
+        return i
     return -1
 
 
-def find_weakness(data: List[int], idx: int) -> int:
+# Same as analyse, for the solvers, which have no answer without it
+def invalid_index(data: Sequence[int], preamble=25) -> int:
+    idx = analyse(data, preamble)
+    if idx < 0:
+        raise RuntimeError('no number breaks the rule')
+    return idx
+
+
+# Two pointers over the (non-negative) numbers before the invalid one,
+# looking for a range of at least two that adds up to it.
+def find_weakness(data: Sequence[int], idx: int) -> int:
     needle = data[idx]
-    for i in range(idx - 1, 0, -1):
-        offset = 0
-        summed = data[i]
-        while offset == 0 or summed < needle:
-            offset += 1
-            summed += data[i - offset]
-        if summed == needle:
-            sub_data = data[i - offset:i]
+    lo = 0
+    total = 0
+    for hi in range(idx):
+        total += data[hi]
+        while total > needle and lo < hi:
+            total -= data[lo]
+            lo += 1
+        if total == needle and hi > lo:
+            sub_data = data[lo:hi + 1]
             return min(sub_data) + max(sub_data)
     return -1
 
 
+register(9, 1, load_ints, lambda d: d[invalid_index(d)])
+register(9, 2, load_ints, lambda d: find_weakness(d, invalid_index(d)))
+
+
 if __name__ == "__main__":
-    numbers = as_int(load('day9-test.txt'))
+    numbers = load_ints('day9-test.txt')
     index = analyse(numbers, 5)
     weakness = find_weakness(numbers, index)
     assert numbers[index] == 127
     assert weakness == 62
 
-    numbers = as_int(load('day9.txt'))
+    numbers = load_ints('day9.txt')
     index = analyse(numbers)
     weakness = find_weakness(numbers, index)
     assert numbers[index] == 41682220
+    assert weakness == 5388976
     print('Missing sum is %d, weakness is %d' % (numbers[index], weakness))
+
+    assert analyse([1, 2, 3, 5, 8], 2) == -1
+    try:
+        invalid_index([1, 2, 3, 5, 8], 2)
+        assert False
+    except RuntimeError:
+        pass
+
+    invalid = next(validate(map(int, stream('day9.txt'))))
+    assert invalid == (index, numbers[index])
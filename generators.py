@@ -0,0 +1,474 @@
+from random import Random
+from string import ascii_lowercase
+from typing import Callable, Dict, List
+
+# Seeded generators for synthetic puzzle inputs, one per day. Each takes a
+# random generator and a size and returns the lines of the input file.
+
+Generator = Callable[[Random, int], List[str]]
+
+GENERATORS: Dict[int, Generator] = {}
+
+# Default size per day, roughly that of the actual puzzle inputs.
+SIZES: Dict[int, int] = {}
+
+
+def generator(day: int, size: int):
+    def wrap(f: Generator) -> Generator:
+        GENERATORS[day] = f
+        SIZES[day] = size
+        return f
+
+    return wrap
+
+
+def generate(day: int, size: int = None, seed: int = 0) -> List[str]:
+    return GENERATORS[day](Random(seed), size or SIZES[day])
+
+
+def _word(rng: Random, length: int) -> str:
+    return ''.join(rng.choice(ascii_lowercase) for _ in range(length))
+
+
+def _letters(i: int) -> str:
+    s = ''
+    while True:
+        s = ascii_lowercase[i % 26] + s
+        i = i // 26
+        if i == 0:
+            return s
+
+
+# N expense numbers with one planted pair and triple summing to 2020
+@generator(1, 200)
+def expenses(rng: Random, n: int) -> List[str]:
+    numbers = [rng.randint(1000, 10 ** 6) for _ in range(max(n - 5, 0))]
+    a = rng.randint(500, 1500)
+    b = rng.randint(100, 500)
+    c = rng.randint(100, 500)
+    numbers += [a, 2020 - a, b, c, 2020 - b - c]
+    rng.shuffle(numbers)
+    return [str(e) for e in numbers]
+
+
+@generator(2, 1000)
+def passwords(rng: Random, n: int) -> List[str]:
+    lines = []
+    for _ in range(n):
+        pw = _word(rng, rng.randint(5, 20))
+        low = rng.randint(1, len(pw) - 1)
+        high = rng.randint(low + 1, len(pw))
+        lines.append('%d-%d %s: %s' % (low, high, rng.choice(pw), pw))
+    return lines
+
+
+# N rows of a 31 wide map
+@generator(3, 323)
+def tree_map(rng: Random, n: int) -> List[str]:
+    return [''.join('#' if rng.random() < 0.2 else '.' for _ in range(31))
+            for _ in range(n)]
+
+
+@generator(4, 300)
+def passports(rng: Random, n: int) -> List[str]:
+    values = {
+        'byr': lambda: str(rng.randint(1900, 2010)),
+        'iyr': lambda: str(rng.randint(2005, 2025)),
+        'eyr': lambda: str(rng.randint(2015, 2035)),
+        'hgt': lambda: rng.choice(['%dcm' % rng.randint(140, 200),
+                                   '%din' % rng.randint(50, 80),
+                                   str(rng.randint(50, 200))]),
+        'hcl': lambda: rng.choice(['#', '']) + '%06x' % rng.randrange(1 << 24),
+        'ecl': lambda: rng.choice(['amb', 'blu', 'brn', 'gry', 'grn', 'hzl',
+                                   'oth', 'xyz']),
+        'pid': lambda: '%0*d' % (rng.choice([8, 9, 9, 10]),
+                                 rng.randrange(10 ** 8)),
+        'cid': lambda: str(rng.randint(100, 999)),
+    }
+    lines = []
+    for _ in range(n):
+        fields = ['%s:%s' % (k, v()) for k, v in values.items()
+                  if rng.random() < 0.95]
+        rng.shuffle(fields)
+        while fields:
+            cut = rng.randint(1, len(fields))
+            lines.append(' '.join(fields[:cut]))
+            fields = fields[cut:]
+        lines.append('')
+    return lines[:-1]
+
+
+# At most 1000 consecutive seats (10 bit codes) with one missing
+@generator(5, 800)
+def boarding_passes(rng: Random, n: int) -> List[str]:
+    n = max(3, min(n, 1000))
+    first = rng.randint(8, 1016 - n)
+    seats = list(range(first, first + n))
+    seats.pop(rng.randint(1, n - 2))
+    rng.shuffle(seats)
+    rows = str.maketrans('01', 'FB')
+    columns = str.maketrans('01', 'LR')
+    return ['{:07b}'.format(s >> 3).translate(rows) +
+            '{:03b}'.format(s & 7).translate(columns)
+            for s in seats]
+
+
+# N groups of up to 5 people
+@generator(6, 500)
+def answers(rng: Random, n: int) -> List[str]:
+    lines = []
+    for _ in range(n):
+        common = rng.sample(ascii_lowercase, rng.randint(0, 5))
+        for _ in range(rng.randint(1, 5)):
+            extra = rng.sample(ascii_lowercase, rng.randint(0, 10))
+            lines.append(''.join(sorted(set(common + extra))) or 'a')
+        lines.append('')
+    return lines[:-1]
+
+
+# N colours in 8 layers, bags only contain bags of deeper layers and
+# 'shiny gold' sits somewhere in the middle
+@generator(7, 600)
+def bag_rules(rng: Random, n: int, layers=8) -> List[str]:
+    n = max(n, 3)
+    names = ['%s %s' % (_letters(i), rng.choice(['red', 'blue', 'tan']))
+             for i in range(n)]
+    names[n // 2] = 'shiny gold'
+    lines = []
+    for i, name in enumerate(names):
+        later = range(min(n, (i * layers // n + 1) * n // layers + 1), n)
+        if not later:
+            later = range(i + 1, n)
+        count = min(len(later), rng.choice([0, 1, 2, 2, 3]))
+        if i < n // 2 and count == 0:
+            count = 1
+        contents = rng.sample(later, count)
+        if i == n // 2 - 1 and n // 2 not in contents:
+            contents[0] = n // 2
+        if contents:
+            inner = ', '.join(
+                '%d %s bag%s' % (q, names[c], '' if q == 1 else 's')
+                for q, c in ((rng.randint(1, 5), c) for c in contents))
+        else:
+            inner = 'no other bags'
+        lines.append('%s bags contain %s.' % (name, inner))
+    rng.shuffle(lines)
+    return lines
+
+
+# M instructions that terminate, except for one corrupted jmp that loops
+@generator(8, 650)
+def boot_code(rng: Random, m: int) -> List[str]:
+    m = max(m, 3)
+    program = []
+    while len(program) < m:
+        op = rng.choice(['acc', 'acc', 'nop', 'jmp'])
+        arg = rng.randint(1, 4) if op == 'jmp' else rng.randint(-50, 50)
+        program.append([op, arg])
+    program[-1] = ['acc', 1]
+    # trace the path of the correct program and corrupt a nop on it
+    path, ip = [], 0
+    while ip < m:
+        path.append(ip)
+        ip += program[ip][1] if program[ip][0] == 'jmp' else 1
+    i = path[rng.randint(len(path) // 2, len(path) - 1)]
+    # the correct instruction is a nop, which follows the same path
+    if i == 0:
+        program[0] = ['jmp', 0]
+    else:
+        program[i] = ['jmp', path[rng.randint(0, path.index(i) - 1)] - i]
+    return ['%s %+d' % (op, arg) for op, arg in program]
+
+
+# N numbers with a window of 25, the invalid number at the end
+@generator(9, 1000)
+def xmas(rng: Random, n: int, preamble=25) -> List[str]:
+    # keeping two zeros in the window bounds the values, as any number
+    # in the window can be repeated by adding zero to it
+    numbers = [0, 0] + [rng.randint(1, 1000) for _ in range(preamble - 2)]
+    while len(numbers) < max(n, preamble + 3) - 1:
+        window = numbers[-preamble:]
+        if window[1:].count(0) < 2:
+            numbers.append(0)
+            continue
+        a, b = rng.sample(window, 2)
+        numbers.append(a + b if a + b <= 10 ** 6 else a)
+    # a range larger than any pair in the window can add up to
+    window_max = max(numbers[-preamble:])
+    total, start = 0, len(numbers)
+    while total <= 2 * window_max or len(numbers) - start < 2:
+        start -= 1
+        total += numbers[start]
+    numbers.append(total)
+    return [str(v) for v in numbers]
+
+
+# N adapters with differences of 1 or 3 and at most 4 ones in a row
+@generator(10, 100)
+def adapters(rng: Random, n: int) -> List[str]:
+    joltages, jolt, ones = [], 0, 0
+    for _ in range(n):
+        delta = 3 if ones == 4 else rng.choice([1, 1, 3])
+        ones = ones + 1 if delta == 1 else 0
+        jolt += delta
+        joltages.append(jolt)
+    rng.shuffle(joltages)
+    return [str(j) for j in joltages]
+
+
+# K x K seating area
+@generator(11, 95)
+def seating(rng: Random, k: int) -> List[str]:
+    return [''.join('L' if rng.random() < 0.85 else '.' for _ in range(k))
+            for _ in range(k)]
+
+
+@generator(12, 780)
+def navigation(rng: Random, n: int) -> List[str]:
+    lines = []
+    for _ in range(n):
+        action = rng.choice('NSEWLRFF')
+        if action in 'LR':
+            lines.append(action + str(rng.choice([90, 180, 270])))
+        else:
+            lines.append(action + str(rng.randint(1, 100)))
+    return lines
+
+
+def _primes(limit: int) -> List[int]:
+    sieve = [True] * limit
+    for i in range(2, int(limit ** 0.5) + 1):
+        if sieve[i]:
+            sieve[i * i::i] = [False] * len(sieve[i * i::i])
+    return [i for i in range(2, limit) if sieve[i]]
+
+
+# N schedule slots, busses are distinct primes
+@generator(13, 70)
+def bus_schedule(rng: Random, n: int) -> List[str]:
+    primes = _primes(1000)[3:]
+    rng.shuffle(primes)
+    slots = [str(primes.pop())]
+    for _ in range(n - 1):
+        if rng.random() < 0.25 and primes:
+            slots.append(str(primes.pop()))
+        else:
+            slots.append('x')
+    return [str(rng.randint(10 ** 5, 10 ** 7)), ','.join(slots)]
+
+
+# N lines of masks and writes, masks have at most 9 floating bits
+@generator(14, 580)
+def docking(rng: Random, n: int) -> List[str]:
+    lines = []
+    while len(lines) < n:
+        mask = [rng.choice('01') for _ in range(36)]
+        for i in rng.sample(range(36), rng.randint(0, 9)):
+            mask[i] = 'X'
+        lines.append('mask = ' + ''.join(mask))
+        for _ in range(rng.randint(1, 6)):
+            lines.append('mem[%d] = %d' % (rng.randrange(1 << 16),
+                                           rng.randrange(1 << 30)))
+    return lines[:max(n, 2)]
+
+
+# N distinct starting numbers
+@generator(15, 6)
+def starting_numbers(rng: Random, n: int) -> List[str]:
+    return [','.join(str(i) for i in rng.sample(range(max(n * 3, 20)), n))]
+
+
+# N nearby tickets for 20 fields with nested ranges, so that the fields
+# can be mapped to columns one by one
+@generator(16, 240)
+def tickets(rng: Random, n: int, fields=20) -> List[str]:
+    # at least one departure field, part 2 multiplies those
+    departures = rng.randint(1, min(6, fields))
+    names = sorted(rng.sample(['departure ' + _letters(i) for i in range(6)],
+                              departures) +
+                   rng.sample([_letters(i) + ' field' for i in range(50)],
+                              fields - departures))
+    lines = ['%s: 1-%d or %d-%d' % (name, 50 * (i + 1), 50 * (i + 1) + 1,
+                                    100 * (i + 1))
+             for i, name in enumerate(names)]
+    columns = list(range(fields))
+    rng.shuffle(columns)
+
+    def ticket(first: bool) -> str:
+        numbers = []
+        for f in columns:
+            if first:
+                numbers.append(rng.randint(100 * f + 1, 100 * (f + 1)))
+            else:
+                numbers.append(rng.randint(1, 100 * (f + 1)))
+        if not first and rng.random() < 0.2:
+            numbers[rng.randrange(fields)] = rng.randint(100 * fields + 1,
+                                                         100 * fields + 500)
+        return ','.join(str(n) for n in numbers)
+
+    lines += ['', 'your ticket:', ticket(True),
+              '', 'nearby tickets:', ticket(True)]
+    lines += [ticket(False) for _ in range(n - 1)]
+    return lines
+
+
+# K x K initial slice
+@generator(17, 8)
+def cubes(rng: Random, k: int) -> List[str]:
+    return [''.join(rng.choice('.#') for _ in range(k)) for _ in range(k)]
+
+
+def _expression(rng: Random, depth: int) -> str:
+    terms = []
+    for _ in range(rng.randint(2, 4)):
+        if depth < 3 and rng.random() < 0.3:
+            terms.append('(' + _expression(rng, depth + 1) + ')')
+        else:
+            terms.append(str(rng.randint(1, 9)))
+    expression = terms[0]
+    for t in terms[1:]:
+        expression += rng.choice([' + ', ' * ']) + t
+    return expression
+
+
+@generator(18, 370)
+def homework(rng: Random, n: int) -> List[str]:
+    return [_expression(rng, 0) for _ in range(n)]
+
+
+# Fixed grammar where 42 and 31 match 8 letters, and N messages
+@generator(19, 470)
+def messages(rng: Random, n: int) -> List[str]:
+    rules = ['0: 8 11', '8: 42', '11: 42 31', '42: 1 5', '31: 2 5',
+             '5: 3 3 3 4', '4: 6 6', '6: 1 1 | 2 2', '3: 1 | 2',
+             '1: "a"', '2: "b"']
+
+    def chunk(head: str) -> str:
+        tail = ''.join(rng.choice('ab') for _ in range(3))
+        return head + tail + ''.join(rng.choice(['aa', 'bb']) for _ in range(2))
+
+    msgs = []
+    for _ in range(n):
+        if rng.random() < 0.3:
+            msgs.append(''.join(rng.choice('ab')
+                                for _ in range(8 * rng.randint(2, 6))))
+        else:
+            count31 = rng.randint(1, 3)
+            count42 = rng.randint(count31, count31 + 3)
+            msgs.append(''.join(chunk('a') for _ in range(count42)) +
+                        ''.join(chunk('b') for _ in range(count31)))
+    return rules + [''] + msgs
+
+
+# T tiles cut out of a random image, T is rounded to a square of at most
+# 12 x 12 tiles as there are only so many unique 10 bit borders
+@generator(20, 144)
+def tiles(rng: Random, t: int) -> List[str]:
+    side = max(2, min(int(t ** 0.5), 12))
+    size = 9 * side + 1
+    image = [[rng.choice('.#') for _ in range(size)] for _ in range(size)]
+
+    # make all borders unique, also when flipped, by redrawing the inner
+    # part of a border until it is
+    seen = set()
+    for i in range(0, size, 9):
+        for j in range(0, size - 1, 9):
+            for cells in ([(i, k) for k in range(j, j + 10)],
+                          [(k, i) for k in range(j, j + 10)]):
+                while True:
+                    b = ''.join(image[y][x] for y, x in cells)
+                    key = min(b, b[::-1])
+                    if key not in seen and b != b[::-1]:
+                        break
+                    for y, x in cells[1:-1]:
+                        image[y][x] = rng.choice('.#')
+                seen.add(key)
+
+    ids = rng.sample(range(1000, 10000), side * side)
+    lines = []
+    for r in range(side):
+        for c in range(side):
+            grid = [''.join(row[9 * c:9 * c + 10])
+                    for row in image[9 * r:9 * r + 10]]
+            for _ in range(rng.randrange(4)):
+                grid = [''.join(z) for z in zip(*reversed(grid))]
+            if rng.random() < 0.5:
+                grid = [row[::-1] for row in grid]
+            lines += ['Tile %d:' % ids.pop()] + grid + ['']
+    return lines[:-1]
+
+
+# N foods with 8 allergens, each food lists the allergens it contains
+@generator(21, 40)
+def foods(rng: Random, n: int, num_allergens=8) -> List[str]:
+    words = set()
+    while len(words) < 200 + num_allergens:
+        words.add(_word(rng, rng.randint(4, 8)))
+    words = sorted(words)
+    rng.shuffle(words)
+    unsafe, safe = words[:num_allergens], words[num_allergens:]
+    allergens = set()
+    while len(allergens) < num_allergens:
+        allergens.add(_word(rng, 5))
+    allergens = sorted(allergens)
+    lines = []
+    for i in range(max(n, 2 * num_allergens)):
+        if i < 2 * num_allergens:
+            # two foods per allergen with nothing else in common
+            listed = [i // 2]
+            half = len(safe) // 2
+            pool = safe[:half] if i % 2 else safe[half:]
+        else:
+            listed = rng.sample(range(num_allergens), rng.randint(1, 3))
+            pool = safe
+        ingredients = rng.sample(pool, rng.randint(5, 30)) + \
+            [unsafe[a] for a in listed]
+        rng.shuffle(ingredients)
+        lines.append('%s (contains %s)' %
+                     (' '.join(ingredients),
+                      ', '.join(allergens[a] for a in sorted(listed))))
+    rng.shuffle(lines)
+    return lines
+
+
+# Two decks of D cards each, avoiding decks where plain combat never ends
+@generator(22, 25)
+def decks(rng: Random, d: int) -> List[str]:
+    while True:
+        cards = list(range(1, 2 * d + 1))
+        rng.shuffle(cards)
+        h1, h2 = cards[:d], cards[d:]
+        p1, p2 = list(h1), list(h2)
+        rounds = 0
+        while p1 and p2 and rounds < 100 * d * d:
+            a, b = p1.pop(0), p2.pop(0)
+            if a > b:
+                p1 += [a, b]
+            else:
+                p2 += [b, a]
+            rounds += 1
+        if not p1 or not p2:
+            break
+    return ['Player 1:'] + [str(c) for c in h1] + \
+           ['', 'Player 2:'] + [str(c) for c in h2]
+
+
+# The number of cups is fixed by the puzzle, only the order is random
+@generator(23, 9)
+def cups(rng: Random, _: int) -> List[str]:
+    labels = list('123456789')
+    rng.shuffle(labels)
+    return [''.join(labels)]
+
+
+@generator(24, 320)
+def hex_tiles(rng: Random, n: int) -> List[str]:
+    return [''.join(rng.choice(['e', 'se', 'sw', 'w', 'nw', 'ne'])
+                    for _ in range(rng.randint(10, 20)))
+            for _ in range(n)]
+
+
+# Public keys for loop sizes of up to N
+@generator(25, 10 ** 6)
+def public_keys(rng: Random, n: int) -> List[str]:
+    return [str(pow(7, rng.randint(n // 2, n), 20201227)) for _ in range(2)]
@@ -0,0 +1,20 @@
+from typing import Any, Callable, Dict, NamedTuple
+
+
+class Solver(NamedTuple):
+    name: str
+    parse: Callable[[str], Any]  # input file -> parsed puzzle input
+    solve: Callable[[Any], Any]  # parsed puzzle input -> answer
+    data: str  # default input file
+
+
+SOLVERS: Dict[str, Solver] = {}
+
+
+def register(day: int, part: int,
+             parse: Callable[[str], Any], solve: Callable[[Any], Any],
+             data: str = None) -> Solver:
+    name = 'day%d.part%d' % (day, part)
+    solver = Solver(name, parse, solve, data or 'day%d.txt' % day)
+    SOLVERS[name] = solver
+    return solver
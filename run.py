@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout
+from typing import Dict, Iterator, List
+
+from registry import SOLVERS, Solver
+
+DAYS = ['day%d' % d for d in range(1, 26)]
+
+
+# Selection is either a day ('day8') or a single part ('day8.part2')
+def select(names: List[str]) -> Iterator[Solver]:
+    for name in names or DAYS:
+        module = name.split('.')[0]
+        importlib.import_module(module)
+        solvers = [s for n, s in SOLVERS.items()
+                   if n == name or n.startswith(name + '.')]
+        if not solvers:
+            raise KeyError(name)
+        yield from sorted(solvers, key=lambda s: s.name)
+
+
+# With trace, the peak of the memory allocated while parsing and solving is
+# measured too. Tracing slows the solvers down, so timings taken with it
+# aren't comparable to the ones without.
+def run(solver: Solver, filename: str = None, trace=False) -> Dict:
+    filename = filename or solver.data
+    if trace:
+        tracemalloc.start()
+    try:
+        # keep stdout for the results, the solvers are rather chatty
+        with redirect_stdout(sys.stderr):
+            start = time.perf_counter()
+            data = solver.parse(filename)
+            parsed = time.perf_counter()
+            answer = solver.solve(data)
+            solved = time.perf_counter()
+        if trace:
+            peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        if trace:
+            tracemalloc.stop()
+    result = {
+        'solver': solver.name,
+        'input': filename,
+        'parse_s': parsed - start,
+        'solve_s': solved - parsed,
+        'answer': answer,
+    }
+    if trace:
+        result['peak_alloc_kb'] = peak // 1024
+    return result
+
+
+def _init_worker(names: List[str]):
+    # import (and register) the solvers once per worker
+    list(select(names))
+
+
+def _run_in_worker(name: str, filename: str, trace: bool) -> Dict:
+    try:
+        return run(SOLVERS[name], filename, trace)
+    except Exception as e:
+        return {'solver': name, 'input': filename, 'error': repr(e)}
+
+
+# Runs every solver on every file in the directory, results are yielded
+# as they complete.
+def batch(names: List[str], directory: str, workers: int = None,
+          trace=False) -> Iterator[Dict]:
+    solvers = []
+    for name in names or DAYS:
+        try:
+            solvers += [s.name for s in select([name])]
+        except (ImportError, KeyError) as e:
+            yield {'solver': name, 'error': repr(e)}
+    files = sorted(os.path.join(directory, f) for f in os.listdir(directory)
+                   if os.path.isfile(os.path.join(directory, f)))
+    with ProcessPoolExecutor(workers, initializer=_init_worker,
+                             initargs=(solvers,)) as pool:
+        futures = [pool.submit(_run_in_worker, s, f, trace)
+                   for s in solvers for f in files]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(
+        description='Run puzzle solvers and report timings as JSON lines.')
+    parser.add_argument('solvers', nargs='*',
+                        help='day (e.g. day8) or part (e.g. day8.part2), '
+                             'default is all')
+    parser.add_argument('-i', '--input',
+                        help='input file instead of the default data file')
+    parser.add_argument('-b', '--batch', metavar='DIR',
+                        help='run on every input file in this directory, '
+                             'in parallel')
+    parser.add_argument('-j', '--jobs', type=int,
+                        help='number of worker processes for --batch, '
+                             'default is the number of CPUs')
+    parser.add_argument('-m', '--memory', action='store_true',
+                        help='also report the peak allocated memory, '
+                             'slows the solvers down')
+    args = parser.parse_args(argv)
+    filename = os.path.abspath(args.input) if args.input else None
+
+    failed = False
+    if args.batch:
+        for result in batch(args.solvers, os.path.abspath(args.batch),
+                            args.jobs, args.memory):
+            failed |= 'error' in result
+            print(json.dumps(result), flush=True)
+        return 1 if failed else 0
+
+    for name in args.solvers or DAYS:
+        try:
+            solvers = list(select([name]))
+        except (ImportError, KeyError) as e:
+            print(json.dumps({'solver': name, 'error': repr(e)}), flush=True)
+            failed = True
+            continue
+        for solver in solvers:
+            try:
+                result = run(solver, filename, args.memory)
+            except Exception as e:
+                result = {'solver': solver.name, 'error': repr(e)}
+                failed = True
+            print(json.dumps(result), flush=True)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
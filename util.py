@@ -1,11 +1,120 @@
-from typing import List
+import mmap
+import os
+from array import array
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+DATA_DIR = 'data/'
 
 
 def load(filename) ->List[str]:
-    with open('data/' + filename, 'r') as f:
+    with open(os.path.join(DATA_DIR, filename), 'r') as f:
         lines = f.read().splitlines()
     return lines
 
 
 def as_int(l: List[str]) -> List[int]:
-    return list(map(lambda x: int(x), l))
+    return list(map(int, l))
+
+
+# Whitespace separated integers straight from the raw bytes into a compact
+# array of 64-bit ints, falling back to a list of Python ints on overflow.
+def parse_ints(buffer: bytes) -> Sequence[int]:
+    values = buffer.split()
+    try:
+        return array('q', map(int, values))
+    except OverflowError:
+        return list(map(int, values))
+
+
+# Same as parse_ints() on the whole file, but only ever copying a block of
+# lines out of the memory mapped file at a time.
+def load_ints(filename) -> Sequence[int]:
+    values = array('q')
+    with Mapped(filename) as f:
+        for block in f.blocks():
+            numbers = parse_ints(bytes(block))
+            if isinstance(numbers, list) and isinstance(values, array):
+                values = list(values)  # overflow, as in parse_ints
+            values.extend(numbers)
+    return values
+
+
+# Lazy alternative to load(), only one line is kept in memory at any time.
+def stream(filename) -> Iterator[str]:
+    with open(os.path.join(DATA_DIR, filename), 'r') as f:
+        for line in f:
+            yield line.rstrip('\r\n')
+
+
+# Read-only memory map of a file, pages are only read when touched. Lines
+# and blocks are zero-copy views of the map, each one is released when the
+# next one is taken and when the map is closed, so they must not be kept
+# (or sliced) beyond that.
+class Mapped:
+    def __init__(self, filename):
+        self._file = open(os.path.join(DATA_DIR, filename), 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        except ValueError:  # empty file can't be mapped
+            self._map = None
+        self._view = memoryview(self._map if self._map is not None else b'')
+        self._current: Optional[memoryview] = None
+
+    def __len__(self):
+        return len(self._view)
+
+    def __enter__(self) -> 'Mapped':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._current is not None:
+            self._current.release()
+        self._view.release()
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    # Lines between two offsets into the file, without the line endings.
+    # The offsets are absolute, the map is searched directly.
+    def lines(self, start=0, end: int = None) -> Iterator[memoryview]:
+        raw, view = self._map, self._view
+        end = len(view) if end is None else min(end, len(view))
+        while start < end:
+            nl = raw.find(b'\n', start, end)
+            if nl < 0:
+                nl = end
+            stop = nl - 1 if nl > start and view[nl - 1] == 13 else nl
+            yield self._hand_out(start, stop)
+            start = nl + 1
+
+    # Whole lines, about size bytes at a time (more for longer lines)
+    def blocks(self, size=1 << 20) -> Iterator[memoryview]:
+        raw, end = self._map, len(self._view)
+        start = 0
+        while start < end:
+            stop = raw.find(b'\n', min(start + size, end) - 1) + 1 or end
+            yield self._hand_out(start, stop)
+            start = stop
+
+    def _hand_out(self, start: int, stop: int) -> memoryview:
+        if self._current is not None:
+            self._current.release()
+        self._current = self._view[start:stop]
+        return self._current
+
+
+# Group lines into blank-line delimited records.
+def records(lines: Iterable[str]) -> Iterator[List[str]]:
+    record = []
+    for line in lines:
+        if line:
+            record.append(line)
+        elif record:
+            yield record
+            record = []
+    if record:
+        yield record